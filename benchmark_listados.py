@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark de serializacion de los listados: JSON por objetos vs ?format=columnar
+
+Crea un esquema temporal en una base PostgreSQL local, lo llena con el mismo
+volumen que verificar_planes.py y mide, a traves del cliente de pruebas de
+Flask, el tiempo y el tamano de respuesta de /api/equipos, /api/ventas y
+/api/inventario en ambos formatos. El esquema se elimina al terminar.
+
+Uso:
+    BENCH_DATABASE_URL=postgresql://postgres@localhost/durtron_test python benchmark_listados.py [--escala 1.0] [--repeticiones 5]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+
+SCHEMA = 'bench_listados'
+
+RUTAS = ['/api/equipos', '/api/ventas', '/api/inventario']
+
+
+def _medir(client, url, repeticiones):
+    tiempos = []
+    size = 0
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resp = client.get(url)
+        body = resp.get_data()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+        if resp.status_code != 200:
+            raise Exception(f"{url} respondio {resp.status_code}: {body[:200]!r}")
+        size = len(body)
+    return statistics.median(tiempos), size
+
+
+def benchmark(url, escala=1.0, repeticiones=5):
+    admin = psycopg2.connect(url)
+    admin.autocommit = True
+    admin.cursor().execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}')
+    try:
+        # La app (y su arranque, que aplica las migraciones) trabaja dentro del esquema temporal
+        os.environ['DATABASE_URL'] = url
+        os.environ['PGOPTIONS'] = f'-c search_path={SCHEMA},public'
+        import app as durtron
+        from verificar_planes import SEED_SQL, TABLAS, VOLUMEN
+
+        volumen = {k: max(1, int(v * escala)) for k, v in VOLUMEN.items()}
+        conn = psycopg2.connect(url)
+        cur = conn.cursor()
+        cur.execute(SEED_SQL, volumen)
+        for t in TABLAS:
+            cur.execute(f'ANALYZE {t}')
+        conn.commit()
+        conn.close()
+        print(f"Esquema '{SCHEMA}' sembrado (escala {escala}), {repeticiones} repeticiones por caso\n")
+
+        client = durtron.app.test_client()
+        with client.session_transaction() as s:
+            s['logged_in'] = True
+            s['usuario'] = 'benchmark'
+
+        print(f"{'ruta':<18}{'objetos ms':>12}{'columnar ms':>13}{'objetos KB':>12}{'columnar KB':>13}{'x':>7}")
+        for ruta in RUTAS:
+            _medir(client, ruta, 1)  # calentamiento (pool, encoders)
+            t_obj, b_obj = _medir(client, ruta, repeticiones)
+            t_col, b_col = _medir(client, ruta + '?format=columnar', repeticiones)
+            print(f"{ruta:<18}{t_obj:>12.1f}{t_col:>13.1f}{b_obj / 1024:>12.0f}{b_col / 1024:>13.0f}"
+                  f"{t_obj / t_col:>7.2f}")
+    finally:
+        admin.cursor().execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        admin.close()
+
+
+if __name__ == '__main__':
+    url = os.environ.get('BENCH_DATABASE_URL', '')
+    if not url:
+        print("Defina BENCH_DATABASE_URL con una base PostgreSQL local de pruebas")
+        sys.exit(2)
+    escala = 1.0
+    repeticiones = 5
+    if '--escala' in sys.argv:
+        escala = float(sys.argv[sys.argv.index('--escala') + 1])
+    if '--repeticiones' in sys.argv:
+        repeticiones = int(sys.argv[sys.argv.index('--repeticiones') + 1])
+    benchmark(url.replace('postgres://', 'postgresql://', 1), escala, repeticiones)
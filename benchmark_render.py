@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Benchmark de generacion de etiquetas y ordenes de compra (render.py)
+
+Crea un esquema temporal en una base PostgreSQL local, lo siembra con equipos,
+partes, requisiciones e inventario, y pide a traves del cliente de pruebas de
+Flask cada documento con 1 a 1000 items:
+
+- etiqueta / etiqueta_req: N etiquetas seguidas (una peticion por etiqueta)
+- orden_equipo / orden_req: una orden con N filas (PNG y PDF vectorial)
+
+El render corre en el mismo proceso (RENDER_INLINE=1) y sin cache en disco,
+asi cada peticion genera su documento y se puede medir. Por caso se registra:
+tiempo total, tiempo de dibujo y de codificacion PNG, bytes de salida, pico
+de memoria Python (tracemalloc) y bytes de los rasters. tracemalloc no ve los
+buffers de Pillow (se reservan en C), por eso el raster se cuenta aparte.
+
+Los resultados se comparan contra una linea base JSON: si un caso tarda,
+pesa o usa memoria mas de --umbral por encima de la base, el script termina
+con codigo 1. Con --guardar se escribe la linea base en vez de comparar.
+
+Uso:
+    BENCH_DATABASE_URL=postgresql://postgres@localhost/durtron_test python benchmark_render.py [--guardar]
+        [--base benchmark_render.json] [--umbral 0.25] [--conteos 1,10,100,500,1000]
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import psycopg2
+
+SCHEMA = 'bench_render'
+CONTEOS = [1, 10, 100, 500, 1000]
+BASE_DEFAULT = 'benchmark_render.json'
+UMBRAL_DEFAULT = 0.25
+# Diferencias menores a esto no cuentan como regresion (ruido de medicion)
+MINIMO_MS = 5
+MINIMO_KB = 64
+PROVEEDOR = 'Proveedor Bench'
+METRICAS = [('wall_ms', MINIMO_MS), ('encode_ms', MINIMO_MS), ('bytes', MINIMO_KB * 1024),
+            ('peak_kb', MINIMO_KB), ('raster_kb', MINIMO_KB)]
+
+# Un equipo y una requisicion por conteo (BEQ-n, BREQ-n) con n partes/items
+# del mismo proveedor; inventario con tantas unidades como el conteo mayor.
+SEED_SQL = '''
+INSERT INTO proveedores (razon_social, contacto_nombre) VALUES (%(proveedor)s, 'Contacto Bench');
+
+INSERT INTO equipos (codigo, nombre, marca, modelo, capacidad, potencia_motor, dimensiones, peso)
+SELECT 'BEQ-' || n, 'Quebradora de quijada ' || n, 'DURTRON', 'QJ-' || n, '25 t/h', '75 HP',
+       '24x36 pulg', '12 t'
+FROM unnest(%(conteos)s::int[]) n;
+
+INSERT INTO equipo_partes (equipo_id, nombre_parte, descripcion, cantidad, unidad, proveedor_id)
+SELECT e.id, 'Parte ' || g || ' de la quebradora', 'Acero al manganeso ' || g, 1 + g %% 7, 'pza',
+       (SELECT id FROM proveedores WHERE razon_social = %(proveedor)s)
+FROM equipos e, generate_series(1, split_part(e.codigo, '-', 2)::int) g
+WHERE e.codigo LIKE 'BEQ-%%';
+
+INSERT INTO requisiciones (folio, equipo_nombre, area, no_control, emitido_por, aprobado_por, notas)
+SELECT 'BREQ-' || n, 'Quebradora de quijada', 'Produccion', 'NC-' || n, 'Bench', 'Bench', 'Notas de prueba'
+FROM unnest(%(conteos)s::int[]) n;
+
+INSERT INTO requisicion_items (requisicion_id, componente, proveedor_nombre, comentario, cantidad,
+                               precio_unitario, tiene_iva)
+SELECT r.id, 'Componente ' || g, %(proveedor)s, 'Comentario ' || g, 1 + g %% 5, 100 + g, g %% 2 = 0
+FROM requisiciones r, generate_series(1, split_part(r.folio, '-', 2)::int) g
+WHERE r.folio LIKE 'BREQ-%%';
+
+INSERT INTO inventario (equipo_id, numero_serie, estado, fecha_ingreso)
+SELECT (SELECT min(id) FROM equipos WHERE codigo LIKE 'BEQ-%%'), 'BSER-' || g, 'Disponible',
+       DATE '2024-01-01' + g
+FROM generate_series(1, %(unidades)s) g;
+'''
+
+
+def _instrumentar(render):
+    """Envuelve el raster y el PNG de render.py para separar dibujo y codificacion"""
+    medidas = {'dibujo': 0.0, 'png': 0.0, 'raster': 0}
+    a_imagen, a_png = render.a_imagen, render.FORMATOS['png']
+
+    def a_imagen_medido(doc, modo=None):
+        t0 = time.perf_counter()
+        img = a_imagen(doc, modo)
+        medidas['dibujo'] += time.perf_counter() - t0
+        medidas['raster'] += img.width * img.height * len(img.getbands())
+        return img
+
+    def a_png_medido(doc):
+        t0 = time.perf_counter()
+        data = a_png(doc)
+        medidas['png'] += time.perf_counter() - t0
+        return data
+
+    render.a_imagen = a_imagen_medido
+    render.FORMATOS['png'] = a_png_medido
+    return medidas
+
+
+def _casos(cur, n):
+    """[(nombre, [(metodo, url, body)])] para el conteo n"""
+    cur.execute("SELECT id FROM equipos WHERE codigo=%s", (f'BEQ-{n}',))
+    eid = cur.fetchone()[0]
+    cur.execute("SELECT id FROM proveedores WHERE razon_social=%s", (PROVEEDOR,))
+    pid = cur.fetchone()[0]
+    cur.execute("SELECT id FROM requisiciones WHERE folio=%s", (f'BREQ-{n}',))
+    rid = cur.fetchone()[0]
+    cur.execute("SELECT id FROM inventario WHERE numero_serie LIKE 'BSER-%%' ORDER BY id LIMIT %s", (n,))
+    iids = [r[0] for r in cur.fetchall()]
+    prov = PROVEEDOR.replace(' ', '%20')
+    etiqueta = {'equipo': 'Quebradora', 'modelo': 'QJ-1', 'capacidad': '25 t/h', 'potencia': '75 HP',
+                'apertura': '24x36', 'peso': '12 t', 'fecha_fabricacion': '2024-01-01'}
+    return [
+        ('etiqueta', [('get', f'/api/inventario/{i}/etiqueta', None) for i in iids]),
+        ('etiqueta_req', [('post', f'/api/requisiciones/{rid}/etiqueta', dict(etiqueta, numero_serie=f'BS-{i}'))
+                          for i in range(n)]),
+        ('orden_equipo', [('get', f'/api/equipos/{eid}/orden-proveedor/{pid}', None)]),
+        ('orden_req', [('get', f'/api/requisiciones/{rid}/orden-proveedor/{prov}', None)]),
+        ('orden_req_pdf', [('get', f'/api/requisiciones/{rid}/orden-proveedor/{prov}?format=pdf', None)]),
+    ]
+
+
+def _medir(client, medidas, peticiones, memoria=False):
+    """Metricas de una corrida; con memoria=True solo el pico (tracemalloc
+    hace mas lentas las peticiones, asi que no se mezcla con los tiempos)"""
+    for k in medidas:
+        medidas[k] = 0
+    if memoria:
+        tracemalloc.start()
+    size = 0
+    t0 = time.perf_counter()
+    for metodo, url, body in peticiones:
+        resp = getattr(client, metodo)(url, json=body)
+        if resp.status_code != 200:
+            raise Exception(f"{url} respondio {resp.status_code}: {resp.get_data()[:200]!r}")
+        size += len(resp.get_data())
+    wall = (time.perf_counter() - t0) * 1000
+    if memoria:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {'peak_kb': round(peak / 1024)}
+    return {
+        'wall_ms': round(wall, 1),
+        'encode_ms': round((medidas['png'] - medidas['dibujo']) * 1000, 1),
+        'bytes': size,
+        'raster_kb': round(medidas['raster'] / 1024),
+    }
+
+
+def benchmark(url, conteos, repeticiones=3):
+    """{'caso/n': metricas}; la mediana de las repeticiones"""
+    admin = psycopg2.connect(url)
+    admin.autocommit = True
+    admin.cursor().execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}')
+    try:
+        os.environ['DATABASE_URL'] = url
+        # Solo el esquema temporal: las migraciones crean ahi todas las tablas aunque
+        # la base ya tenga las suyas en public, y la siembra no toca public
+        os.environ['PGOPTIONS'] = f'-c search_path={SCHEMA}'
+        os.environ['RENDER_INLINE'] = '1'
+        os.environ['RENDER_CACHE_MAX_MB'] = '0'
+        import app as durtron
+        import render
+
+        conn = psycopg2.connect(url)
+        cur = conn.cursor()
+        cur.execute(SEED_SQL, {'proveedor': PROVEEDOR, 'conteos': conteos, 'unidades': max(conteos)})
+        conn.commit()
+
+        client = durtron.app.test_client()
+        with client.session_transaction() as s:
+            s['logged_in'] = True
+            s['usuario'] = 'benchmark'
+        medidas = _instrumentar(render)
+
+        resultados = {}
+        print(f"{'caso':<22}{'total ms':>10}{'png ms':>9}{'KB':>9}{'pico KB':>10}{'raster KB':>11}")
+        for n in conteos:
+            for nombre, peticiones in _casos(cur, n):
+                _medir(client, medidas, peticiones[:1])  # calentamiento (fuentes, parte fija)
+                corridas = [_medir(client, medidas, peticiones) for _ in range(repeticiones)]
+                r = {k: statistics.median_low(c[k] for c in corridas) for k in corridas[0]}
+                r.update(_medir(client, medidas, peticiones, memoria=True))
+                resultados[f'{nombre}/{n}'] = r
+                print(f"{nombre + '/' + str(n):<22}{r['wall_ms']:>10.1f}{r['encode_ms']:>9.1f}"
+                      f"{r['bytes'] / 1024:>9.0f}{r['peak_kb']:>10}{r['raster_kb']:>11}")
+        conn.close()
+        return resultados
+    finally:
+        admin.cursor().execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        admin.close()
+
+
+def comparar(resultados, base, umbral):
+    """Lista de regresiones (texto) de resultados contra la linea base"""
+    regresiones = []
+    for caso, r in resultados.items():
+        b = base.get(caso)
+        if b is None:
+            continue
+        for metrica, minimo in METRICAS:
+            if metrica not in b:
+                continue
+            if r[metrica] > b[metrica] * (1 + umbral) and r[metrica] - b[metrica] > minimo:
+                regresiones.append(f"{caso} {metrica}: {r[metrica]} (base {b[metrica]}, "
+                                   f"+{(r[metrica] / max(b[metrica], 1) - 1) * 100:.0f}%)")
+    return regresiones
+
+
+if __name__ == '__main__':
+    url = os.environ.get('BENCH_DATABASE_URL', '')
+    if not url:
+        print("Defina BENCH_DATABASE_URL con una base PostgreSQL local de pruebas")
+        sys.exit(2)
+    ruta_base = BASE_DEFAULT
+    umbral = UMBRAL_DEFAULT
+    conteos = CONTEOS
+    repeticiones = 3
+    if '--base' in sys.argv:
+        ruta_base = sys.argv[sys.argv.index('--base') + 1]
+    if '--umbral' in sys.argv:
+        umbral = float(sys.argv[sys.argv.index('--umbral') + 1])
+    if '--conteos' in sys.argv:
+        conteos = [int(x) for x in sys.argv[sys.argv.index('--conteos') + 1].split(',')]
+    if '--repeticiones' in sys.argv:
+        repeticiones = int(sys.argv[sys.argv.index('--repeticiones') + 1])
+
+    resultados = benchmark(url.replace('postgres://', 'postgresql://', 1), conteos, repeticiones)
+
+    if '--guardar' in sys.argv or not os.path.exists(ruta_base):
+        with open(ruta_base, 'w') as f:
+            json.dump(resultados, f, indent=2, sort_keys=True)
+        print(f"\nLinea base guardada en {ruta_base}")
+        sys.exit(0)
+    with open(ruta_base) as f:
+        base = json.load(f)
+    regresiones = comparar(resultados, base, umbral)
+    if regresiones:
+        print(f"\nREGRESIONES (umbral {umbral * 100:.0f}% sobre {ruta_base}):")
+        for r in regresiones:
+            print(f"  {r}")
+        sys.exit(1)
+    print(f"\nSin regresiones contra {ruta_base} (umbral {umbral * 100:.0f}%)")
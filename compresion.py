@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Compresion HTTP para Sistema Durtron
+
+- Respuestas JSON dinamicas: gzip o brotli al vuelo segun Accept-Encoding,
+  solo por encima de COMPRESS_MIN_SIZE (las pequenas no lo ameritan).
+- Archivos estaticos de frontend/: se sirven los hermanos .br/.gz generados
+  en el build (python compresion.py), asi no se recomprimen en cada peticion.
+
+Uso (build):
+    python compresion.py     genera frontend/*.br y *.gz de html/css/js/svg
+"""
+
+import gzip
+import mimetypes
+import os
+import sys
+
+from flask import current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # sin brotli se negocia solo gzip
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_GZIP_LEVEL = 6
+COMPRESS_BROTLI_QUALITY = 4      # al vuelo: buena razon sin costo alto de CPU
+PRECOMPRESS_BROTLI_QUALITY = 11  # build: se comprime una sola vez
+PRECOMPRESS_EXTENSIONS = ('.html', '.css', '.js', '.svg', '.json')
+COMPRESSIBLE_MIMETYPES = {'application/json'}
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend')
+
+
+def _encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding():
+    """'br', 'gzip' o None segun el Accept-Encoding de la peticion (respeta q=0)"""
+    return request.accept_encodings.best_match(_encodings())
+
+
+def _add_vary(resp):
+    resp.vary.add('Accept-Encoding')
+
+
+def compress_response(resp):
+    """after_request: comprime respuestas JSON grandes"""
+    if (resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed
+            or resp.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in resp.headers):
+        return resp
+    _add_vary(resp)
+    data = resp.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return resp
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return resp
+    if encoding == 'br':
+        resp.set_data(brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY))
+    else:
+        resp.set_data(gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL))
+    resp.headers['Content-Encoding'] = encoding
+    # El cuerpo cambia de bytes: un ETag fuerte deja de ser valido, se vuelve debil
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+    return resp
+
+
+def send_static(directory, path):
+    """send_from_directory usando el .br/.gz precomprimido si existe y esta al dia"""
+    # Relativo a la app, como send_from_directory, no al cwd del proceso
+    directory = os.path.join(current_app.root_path, directory)
+    encoding = negotiate_encoding() if path.endswith(PRECOMPRESS_EXTENSIONS) else None
+    original = safe_join(directory, path) if encoding is not None else None
+    if original is not None:
+        ext = '.br' if encoding == 'br' else '.gz'
+        comprimido = original + ext
+        try:
+            al_dia = os.path.getmtime(comprimido) >= os.path.getmtime(original)
+        except OSError:
+            al_dia = False
+        if al_dia:
+            # Tipo del archivo original, no el del .br/.gz
+            mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            resp = send_from_directory(directory, path + ext, mimetype=mimetype)
+            resp.headers['Content-Encoding'] = encoding
+            _add_vary(resp)
+            return resp
+    resp = send_from_directory(directory, path)
+    if path.endswith(PRECOMPRESS_EXTENSIONS):
+        _add_vary(resp)
+    return resp
+
+
+def precompress(directory=FRONTEND_DIR, verbose=True):
+    """Genera los hermanos .gz (y .br si hay brotli) de los estaticos de texto"""
+    total = 0
+    for root, _, files in os.walk(directory):
+        for fname in files:
+            if not fname.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, fname)
+            with open(path, 'rb') as f:
+                data = f.read()
+            salidas = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                salidas.append(('.br', brotli.compress(data, quality=PRECOMPRESS_BROTLI_QUALITY)))
+            for ext, comprimido in salidas:
+                with open(path + ext, 'wb') as f:
+                    f.write(comprimido)
+            total += 1
+            if verbose:
+                tamanos = ' '.join(f"{ext[1:]}={len(c) // 1024}KB" for ext, c in salidas)
+                print(f"  {os.path.relpath(path, directory)}: {len(data) // 1024}KB -> {tamanos}")
+    return total
+
+
+def init_app(app):
+    app.after_request(compress_response)
+
+
+if __name__ == '__main__':
+    if brotli is None:
+        print("Aviso: modulo brotli no instalado, solo se generan .gz", file=sys.stderr)
+    n = precompress()
+    print(f"Estaticos precomprimidos: {n}")
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""Cola de correos salientes para Sistema Durtron
+
+Las rutas no mandan correos: los insertan en email_outbox (migrations/0009)
+dentro de su transaccion con encolar(). Un worker los toma con
+FOR UPDATE SKIP LOCKED (varios workers nunca toman el mismo), los manda por el
+transporte configurado y guarda el resultado:
+
+- enviado: id del proveedor en proveedor_id
+- error temporal (red, 5xx): se reintenta con backoff exponencial
+- 429 del proveedor: se pospone sin contar el intento y se pausa el envio
+- error definitivo (4xx) o EMAIL_MAX_INTENTOS agotados: estado 'error'
+- error definitivo de un lote: cada correo del lote se vuelve a mandar solo,
+  asi un destinatario invalido no tumba a los demas
+
+Mientras un correo se envia queda 'enviando' con un lease: si el proceso
+muere (gunicorn lo recicla por --timeout), al vencer el lease otro lo toma.
+
+El worker es un hilo en cada worker web (EMAIL_WORKER=1, default) o un proceso
+aparte con EMAIL_WORKER=0 en la web y:
+    flask --app app email-worker
+
+Transportes (EMAIL_TRANSPORTE): resend (api.resend.com) o stub, que no usa la
+red y deja cada correo como JSON en EMAIL_STUB_DIR para probar sin conexion.
+El de Resend es uno por proceso: reutiliza conexiones keep-alive (sin DNS+TCP+
+TLS en cada correo), manda juntos los correos sin adjuntos (/emails/batch) y
+limita los envios simultaneos a EMAIL_HTTP_CONEXIONES.
+"""
+
+import base64
+import hashlib
+import http.client
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from psycopg2.extras import Json
+
+from db import get_db
+
+logger = logging.getLogger(__name__)
+
+EMAIL_TRANSPORTE = os.environ.get('EMAIL_TRANSPORTE', 'resend')
+EMAIL_WORKER = os.environ.get('EMAIL_WORKER', '1') == '1'
+EMAIL_LOTE = int(os.environ.get('EMAIL_LOTE', 10))                     # correos por vuelta
+EMAIL_ESPERA = float(os.environ.get('EMAIL_ESPERA', 5))                # segundos entre vueltas sin trabajo
+EMAIL_LEASE = int(os.environ.get('EMAIL_LEASE', 120))                  # segundos que un correo queda tomado
+EMAIL_MAX_INTENTOS = int(os.environ.get('EMAIL_MAX_INTENTOS', 8))
+EMAIL_BACKOFF_BASE = float(os.environ.get('EMAIL_BACKOFF_BASE', 30))   # 30 s, 1 min, 2 min, ... hasta el maximo
+EMAIL_BACKOFF_MAX = float(os.environ.get('EMAIL_BACKOFF_MAX', 3600))
+# Por proceso: Resend permite 2 peticiones/s por cuenta y hay 2 workers web
+EMAIL_POR_SEGUNDO = float(os.environ.get('EMAIL_POR_SEGUNDO', 1))
+EMAIL_STUB_DIR = os.environ.get('EMAIL_STUB_DIR') or os.path.join(tempfile.gettempdir(), 'durtron_outbox')
+
+RESEND_API_KEY = os.environ.get('RESEND_API_KEY', '')
+RESEND_FROM = os.environ.get('RESEND_FROM', 'Durtron <onboarding@resend.dev>')
+RESEND_API_URL = os.environ.get('RESEND_API_URL', 'https://api.resend.com')  # otro valor: servidor de pruebas
+EMAIL_HTTP_CONEXIONES = int(os.environ.get('EMAIL_HTTP_CONEXIONES', 4))  # conexiones e hilos de envio por proceso
+EMAIL_HTTP_TIMEOUT = float(os.environ.get('EMAIL_HTTP_TIMEOUT', 15))     # segundos por peticion
+EMAIL_HTTP_OCIOSA = 30  # segundos: una conexion sin uso mas tiempo se cierra (el servidor ya la habra cerrado)
+
+
+class ErrorEnvio(Exception):
+    """Fallo de un transporte. reintentar=False: el correo no va a salir aunque
+    se reintente (destinatario invalido, llave rechazada). retry_after: el
+    proveedor pidio esperar (limite de envios)."""
+
+    def __init__(self, mensaje, reintentar=True, retry_after=None):
+        super().__init__(mensaje)
+        self.reintentar = reintentar
+        self.retry_after = retry_after
+
+
+# ==================== TRANSPORTES ====================
+# enviar(correo) recibe la fila de email_outbox (destinatario, asunto, texto,
+# adjuntos) y devuelve el id del proveedor o lanza ErrorEnvio. Opcionales:
+# enviar_lote(correos) -> [ids] (todo o nada; la llave de idempotencia viene
+# en correo['lote']) con lote_max, y ejecutor
+# (ThreadPoolExecutor acotado) para mandar varias peticiones a la vez.
+class PoolHttp:
+    """Conexiones HTTP(S) keep-alive a un host, reutilizadas entre envios.
+    Nunca hay mas de maxconn abiertas en uso; las ociosas se guardan (LIFO)."""
+
+    # Una conexion reutilizada que el servidor ya cerro falla asi al primer uso
+    _CERRADA = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, url, maxconn=EMAIL_HTTP_CONEXIONES, timeout=EMAIL_HTTP_TIMEOUT):
+        p = urllib.parse.urlsplit(url)
+        self._clase = http.client.HTTPSConnection if p.scheme == 'https' else http.client.HTTPConnection
+        self.host, self.port, self.base = p.hostname, p.port, p.path.rstrip('/')
+        self.timeout = timeout
+        self._sem = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._libres = []  # (conexion, ultimo uso)
+        self.stats = {'nuevas': 0, 'reusadas': 0}
+
+    def _tomar(self):
+        with self._lock:
+            while self._libres:
+                conn, usada = self._libres.pop()
+                if time.monotonic() - usada < EMAIL_HTTP_OCIOSA:
+                    self.stats['reusadas'] += 1
+                    return conn, True
+                conn.close()
+            self.stats['nuevas'] += 1
+        return self._clase(self.host, self.port, timeout=self.timeout), False
+
+    def post(self, ruta, cuerpo, headers, timeout=None):
+        """(status, headers, cuerpo) de la respuesta"""
+        with self._sem:
+            conn, reusada = self._tomar()
+            while True:
+                conn.timeout = timeout or self.timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(conn.timeout)
+                try:
+                    conn.request('POST', self.base + ruta, body=cuerpo, headers=headers)
+                    resp = conn.getresponse()
+                    data = resp.read()
+                except self._CERRADA:
+                    conn.close()
+                    if not reusada:
+                        raise
+                    with self._lock:
+                        self.stats['nuevas'] += 1
+                    conn, reusada = self._clase(self.host, self.port, timeout=self.timeout), False
+                    continue
+                except BaseException:
+                    conn.close()
+                    raise
+                break
+            if resp.will_close:
+                conn.close()
+            else:
+                with self._lock:
+                    self._libres.append((conn, time.monotonic()))
+            return resp.status, resp.headers, data
+
+    def cerrar(self):
+        with self._lock:
+            for conn, _ in self._libres:
+                conn.close()
+            self._libres = []
+
+
+class TransporteResend:
+    """api.resend.com por conexiones keep-alive (PoolHttp). Los correos sin
+    adjuntos van por /emails/batch (hasta 100 por peticion; el API de lotes no
+    acepta adjuntos)."""
+    lote_max = 100
+
+    def __init__(self, api_key=None, remitente=None, url=None, conexiones=EMAIL_HTTP_CONEXIONES,
+                 timeout=EMAIL_HTTP_TIMEOUT):
+        self.api_key = RESEND_API_KEY if api_key is None else api_key
+        self.remitente = remitente or RESEND_FROM
+        self.http = PoolHttp(url or RESEND_API_URL, conexiones, timeout)
+        self.ejecutor = ThreadPoolExecutor(max_workers=conexiones, thread_name_prefix='email-http')
+        self._lock = threading.Lock()
+        self._stats = {'peticiones': 0, 'lotes': 0, 'enviados': 0, 'fallos': 0,
+                       'latencia_ms_total': 0.0, 'latencia_ms_max': 0.0}
+
+    def configurado(self):
+        return bool(self.api_key)
+
+    def payload(self, correo):
+        data = {'from': self.remitente, 'to': [correo['destinatario']],
+                'subject': correo['asunto'], 'text': correo['texto']}
+        if correo.get('adjuntos'):
+            data['attachments'] = correo['adjuntos']
+        return data
+
+    def _post(self, ruta, data, idempotencia=None):
+        headers = {'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json'}
+        if idempotencia:
+            # Si un reintento repite un envio que si salio, Resend no lo duplica
+            headers['Idempotency-Key'] = idempotencia
+        t0 = time.perf_counter()
+        try:
+            status, resp_headers, cuerpo = self.http.post(ruta, json.dumps(data).encode('utf-8'), headers)
+        except (OSError, http.client.HTTPException) as e:
+            self._contar(t0, fallo=True)
+            raise ErrorEnvio(f'Resend no disponible: {e}')
+        self._contar(t0, fallo=status >= 300)
+        if status >= 300:
+            raise error_http(status, cuerpo.decode('utf-8', errors='replace')[:500], resp_headers.get('Retry-After'))
+        return json.loads(cuerpo or b'{}')
+
+    def _contar(self, t0, fallo):
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self._stats['peticiones'] += 1
+            self._stats['fallos'] += fallo
+            self._stats['latencia_ms_total'] += ms
+            self._stats['latencia_ms_max'] = max(self._stats['latencia_ms_max'], ms)
+
+    def enviar(self, correo):
+        clave = f"durtron-email-{correo['id']}" if correo.get('id') else None
+        resp = self._post('/emails', self.payload(correo), clave)
+        with self._lock:
+            self._stats['enviados'] += 1
+        return resp.get('id')
+
+    def enviar_lote(self, correos):
+        clave = correos[0].get('lote') or clave_lote(correos)
+        resp = self._post('/emails/batch', [self.payload(c) for c in correos], clave)
+        with self._lock:
+            self._stats['lotes'] += 1
+            self._stats['enviados'] += len(correos)
+        datos = resp.get('data') or []
+        return [d.get('id') for d in datos] + [None] * (len(correos) - len(datos))
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+        s['latencia_ms_prom'] = round(s['latencia_ms_total'] / s['peticiones'], 1) if s['peticiones'] else 0
+        s['latencia_ms_total'] = round(s['latencia_ms_total'], 1)
+        s['latencia_ms_max'] = round(s['latencia_ms_max'], 1)
+        s['conexiones'] = dict(self.http.stats)
+        return s
+
+
+def clave_lote(correos):
+    """Idempotency-Key de un lote nuevo; se guarda en email_outbox.lote para que
+    un reintento del mismo lote la repita"""
+    ids = ','.join(str(c.get('id')) for c in correos)
+    return 'durtron-lote-' + hashlib.sha1(ids.encode('ascii')).hexdigest()
+
+
+def error_http(status, detalle, retry_after=None):
+    """ErrorEnvio de una respuesta HTTP del proveedor"""
+    if status == 429:
+        try:
+            espera = max(1.0, float(retry_after))
+        except (TypeError, ValueError):
+            espera = EMAIL_BACKOFF_BASE
+        return ErrorEnvio(f'HTTP 429: {detalle}', retry_after=espera)
+    return ErrorEnvio(f'HTTP {status}: {detalle}', reintentar=status >= 500 or status == 408)
+
+
+class TransporteStub:
+    """Sin red: guarda cada correo como JSON en directorio y en self.enviados"""
+
+    def __init__(self, directorio=EMAIL_STUB_DIR):
+        self.directorio = directorio
+        self.enviados = []
+        self._lock = threading.Lock()
+
+    def configurado(self):
+        return True
+
+    def enviar(self, correo):
+        with self._lock:
+            self.enviados.append(correo)
+            pid = f'stub-{correo.get("id", len(self.enviados))}'
+        if self.directorio:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(os.path.join(self.directorio, f'{pid}.json'), 'w') as f:
+                json.dump({k: correo.get(k) for k in ('destinatario', 'asunto', 'texto', 'adjuntos')}, f)
+        logger.info(f'[EMAIL stub] {correo["destinatario"]}: {correo["asunto"]}')
+        return pid
+
+
+TRANSPORTES = {'resend': TransporteResend, 'stub': TransporteStub}
+_transporte = None
+
+
+def transporte():
+    """Transporte del proceso (EMAIL_TRANSPORTE), creado al primer uso"""
+    global _transporte
+    if _transporte is None:
+        if EMAIL_TRANSPORTE not in TRANSPORTES:
+            raise Exception(f"EMAIL_TRANSPORTE debe ser uno de: {', '.join(TRANSPORTES)}")
+        _transporte = TRANSPORTES[EMAIL_TRANSPORTE]()
+    return _transporte
+
+
+def usar_transporte(t):
+    """Reemplaza el transporte del proceso (pruebas, otro proveedor)"""
+    global _transporte
+    _transporte = t
+
+
+# ==================== COLA ====================
+def encolar(cur, tipo, destinatario, asunto, texto, adjuntos=(), requisicion_id=None):
+    """Inserta el correo con el cursor de la ruta (sale al hacer commit; despues
+    llamar a despertar()). adjuntos: [(nombre, bytes)]. Devuelve el id."""
+    adj = [{'filename': nombre, 'content': base64.b64encode(data).decode('ascii')} for nombre, data in adjuntos]
+    cur.execute('''
+        INSERT INTO email_outbox (tipo, requisicion_id, destinatario, asunto, texto, adjuntos)
+        VALUES (%s,%s,%s,%s,%s,%s) RETURNING id
+    ''', (tipo, requisicion_id, destinatario, asunto, texto, Json(adj)))
+    return cur.fetchone()['id']
+
+
+def _tomar(limite):
+    """Marca hasta limite correos como 'enviando' (con lease) y los devuelve.
+    De un lote que se reintenta se toman tambien los companeros que queden
+    fuera del limite, para reenviarlo completo."""
+    conn = get_db()
+    try:
+        cur = conn.cursor()
+        cur.execute('''
+            WITH elegidos AS (
+                SELECT id, lote FROM email_outbox
+                WHERE estado IN ('pendiente', 'enviando') AND proximo_intento <= CURRENT_TIMESTAMP
+                ORDER BY proximo_intento, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ), companeros AS (
+                SELECT id FROM email_outbox
+                WHERE lote IN (SELECT lote FROM elegidos WHERE lote IS NOT NULL)
+                  AND estado IN ('pendiente', 'enviando') AND proximo_intento <= CURRENT_TIMESTAMP
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE email_outbox SET estado = 'enviando', intentos = intentos + 1,
+                   proximo_intento = CURRENT_TIMESTAMP + make_interval(secs => %s)
+            WHERE id IN (SELECT id FROM elegidos UNION SELECT id FROM companeros)
+            RETURNING *
+        ''', (limite, EMAIL_LEASE))
+        filas = sorted(cur.fetchall(), key=lambda r: r['id'])
+        conn.commit()
+        cur.close()
+        return filas
+    finally:
+        conn.close()
+
+
+def _guardar(sql, params):
+    conn = get_db()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+
+
+def _enviado(correo, proveedor_id):
+    _guardar('''
+        UPDATE email_outbox SET estado = 'enviado', proveedor_id = %s, ultimo_error = NULL,
+               enviado = CURRENT_TIMESTAMP
+        WHERE id = %s
+    ''', (proveedor_id, correo['id']))
+
+
+def _reprogramar(ids, espera, error, contar=True):
+    """Regresa los correos a 'pendiente' para dentro de espera segundos"""
+    _guardar('''
+        UPDATE email_outbox SET estado = 'pendiente', ultimo_error = %s,
+               intentos = intentos - %s,
+               proximo_intento = CURRENT_TIMESTAMP + make_interval(secs => %s)
+        WHERE id = ANY(%s)
+    ''', (error, 0 if contar else 1, espera, list(ids)))
+
+
+def _separar(ids, error):
+    """Lote rechazado entero: cada correo vuelve a la cola para mandarse solo,
+    sin gastar el intento"""
+    _guardar('''
+        UPDATE email_outbox SET estado = 'pendiente', individual = true, lote = NULL, ultimo_error = %s,
+               intentos = intentos - 1, proximo_intento = CURRENT_TIMESTAMP
+        WHERE id = ANY(%s)
+    ''', (error, list(ids)))
+
+
+def _asignar_lote(grupo):
+    """Guarda la llave del lote antes de mandarlo (si el proceso muere a media
+    peticion, el reintento usa la misma)"""
+    clave = clave_lote(grupo)
+    _guardar('UPDATE email_outbox SET lote = %s WHERE id = ANY(%s)', (clave, [c['id'] for c in grupo]))
+    for c in grupo:
+        c['lote'] = clave
+
+
+def _fallido(correo, error):
+    _guardar("UPDATE email_outbox SET estado = 'error', ultimo_error = %s WHERE id = %s", (error, correo['id']))
+
+
+def backoff(intentos):
+    """Segundos antes del siguiente intento (exponencial con +-20% de azar)"""
+    espera = min(EMAIL_BACKOFF_MAX, EMAIL_BACKOFF_BASE * 2 ** max(0, intentos - 1))
+    return espera * random.uniform(0.8, 1.2)
+
+
+_ritmo_lock = threading.Lock()
+_ultimo_envio = 0.0
+_pausa_hasta = 0.0
+_stats = {'enviados': 0, 'reintentos': 0, 'fallidos': 0, 'limitados': 0, 'lotes_separados': 0}
+
+
+def _esperar_turno():
+    """Respeta EMAIL_POR_SEGUNDO (peticiones al proveedor por proceso)"""
+    global _ultimo_envio
+    with _ritmo_lock:
+        ahora = time.monotonic()
+        turno = _ultimo_envio + 1 / EMAIL_POR_SEGUNDO
+        if turno > ahora:
+            time.sleep(turno - ahora)
+        _ultimo_envio = time.monotonic()
+
+
+def _grupos(filas, t):
+    """Correos sin adjuntos juntos (hasta t.lote_max) si el transporte manda
+    lotes; los demas de uno en uno. Un lote que se reintenta sale con los
+    mismos correos que la primera vez; los marcados individual, solos."""
+    lote_max = getattr(t, 'lote_max', 1) if hasattr(t, 'enviar_lote') else 1
+    grupos, lote, previos = [], [], {}
+    for c in filas:
+        if lote_max > 1 and c.get('lote'):
+            previos.setdefault(c['lote'], []).append(c)
+        elif lote_max > 1 and not c.get('adjuntos') and not c.get('individual'):
+            lote.append(c)
+            if len(lote) == lote_max:
+                grupos.append(lote)
+                lote = []
+        else:
+            grupos.append([c])
+    if lote:
+        grupos.append(lote)
+    return grupos + list(previos.values())
+
+
+def _enviar_grupo(t, grupo):
+    global _pausa_hasta
+    try:
+        return [t.enviar(grupo[0])] if len(grupo) == 1 else t.enviar_lote(grupo)
+    except ErrorEnvio as e:
+        if e.retry_after:
+            # Los envios que siguen se detienen en procesar()
+            _pausa_hasta = max(_pausa_hasta, time.monotonic() + e.retry_after)
+        raise
+
+
+def _registrar(grupo, futuro):
+    """Guarda en email_outbox el resultado del envio de un grupo"""
+    try:
+        ids = futuro.result()
+    except ErrorEnvio as e:
+        if e.retry_after:
+            # Limite del proveedor: se pospone sin gastar intento
+            _stats['limitados'] += 1
+            _reprogramar([c['id'] for c in grupo], e.retry_after, str(e), contar=False)
+            logger.warning(f'[EMAIL] Limite del proveedor, pausa de {e.retry_after:.0f}s')
+            return
+        if not e.reintentar and len(grupo) > 1:
+            # El lote se rechaza entero aunque el problema sea un solo correo
+            _stats['lotes_separados'] += 1
+            _separar([c['id'] for c in grupo], str(e))
+            logger.warning(f'[EMAIL] Lote {[c["id"] for c in grupo]} rechazado, se manda uno por uno: {e}')
+            return
+        # Una sola espera para todo el grupo: el lote se reintenta junto
+        espera = backoff(max(c['intentos'] for c in grupo))
+        for correo in grupo:
+            if e.reintentar and correo['intentos'] < EMAIL_MAX_INTENTOS:
+                _stats['reintentos'] += 1
+                _reprogramar([correo['id']], espera, str(e))
+                logger.warning(f'[EMAIL] {correo["id"]} a {correo["destinatario"]}: {e} (intento {correo["intentos"]})')
+            else:
+                _stats['fallidos'] += 1
+                _fallido(correo, str(e))
+                logger.error(f'[EMAIL] {correo["id"]} a {correo["destinatario"]} sin enviar: {e}')
+        return
+    except Exception as e:
+        _stats['reintentos'] += len(grupo)
+        _reprogramar([c['id'] for c in grupo], backoff(max(c['intentos'] for c in grupo)),
+                     f'{type(e).__name__}: {e}')
+        logger.exception(f'[EMAIL] {[c["id"] for c in grupo]}: error inesperado')
+        return
+    for correo, pid in zip(grupo, ids):
+        _stats['enviados'] += 1
+        _enviado(correo, pid)
+        logger.info(f'[EMAIL] {correo["id"]} enviado a {correo["destinatario"]} ({pid})')
+
+
+def procesar(limite=None):
+    """Una vuelta del worker: toma hasta limite correos y los envia (en lotes y
+    en paralelo si el transporte lo permite). Devuelve cuantos tomo."""
+    if time.monotonic() < _pausa_hasta:
+        return 0
+    filas = _tomar(limite or EMAIL_LOTE)
+    t = transporte()
+    ejecutor = getattr(t, 'ejecutor', None)
+    grupos = _grupos(filas, t)
+    envios = []
+    for grupo in grupos:
+        _esperar_turno()  # un turno por peticion al proveedor
+        if time.monotonic() < _pausa_hasta:  # un envio anterior recibio 429
+            break
+        if len(grupo) > 1 and not grupo[0].get('lote'):
+            _asignar_lote(grupo)
+        if ejecutor is not None:
+            futuro = ejecutor.submit(_enviar_grupo, t, grupo)
+        else:
+            futuro = Future()
+            try:
+                futuro.set_result(_enviar_grupo(t, grupo))
+            except Exception as e:
+                futuro.set_exception(e)
+        envios.append((grupo, futuro))
+    for grupo, futuro in envios:
+        _registrar(grupo, futuro)
+    sin_enviar = [c['id'] for grupo in grupos[len(envios):] for c in grupo]
+    if sin_enviar:
+        _reprogramar(sin_enviar, max(1.0, _pausa_hasta - time.monotonic()), 'En pausa por limite del proveedor',
+                     contar=False)
+    return len(filas)
+
+
+# ==================== WORKER ====================
+_evento = threading.Event()
+_hilo = None
+_hilo_pid = None
+_hilo_lock = threading.Lock()
+
+
+def despertar():
+    """Avisa al worker de este proceso que hay correos nuevos (tras el commit)"""
+    _evento.set()
+
+
+def bucle(parar=None):
+    """Procesa la cola hasta que parar (threading.Event) se active"""
+    while parar is None or not parar.is_set():
+        try:
+            n = procesar()
+        except Exception as e:
+            logger.error(f'[EMAIL] Error procesando la cola: {e}')
+            n = 0
+        if n < EMAIL_LOTE:
+            restante = _pausa_hasta - time.monotonic()
+            _evento.wait(restante if 0 < restante < EMAIL_ESPERA else EMAIL_ESPERA)
+            _evento.clear()
+
+
+def iniciar_worker():
+    """Hilo del worker en este proceso, una vez por pid (gunicorn hace fork)"""
+    global _hilo, _hilo_pid
+    if _hilo is not None and _hilo_pid == os.getpid() and _hilo.is_alive():
+        return
+    with _hilo_lock:
+        if _hilo is None or _hilo_pid != os.getpid() or not _hilo.is_alive():
+            _hilo = threading.Thread(target=bucle, name='email-outbox', daemon=True)
+            _hilo.start()
+            _hilo_pid = os.getpid()
+
+
+def worker_stats():
+    s = dict(_stats)
+    s.update({'transporte': EMAIL_TRANSPORTE, 'hilo': EMAIL_WORKER,
+              'pausa_s': round(max(0.0, _pausa_hasta - time.monotonic()), 1)})
+    if _transporte is not None and hasattr(_transporte, 'stats'):
+        s['http'] = _transporte.stats()
+    return s
+
+
+def init_app(app):
+    if EMAIL_WORKER:
+        # Al primer request de cada worker web, no al importar (los comandos flask no lo arrancan)
+        app.before_request(iniciar_worker)
@@ -23,18 +23,35 @@ async function cerrarSesion() {
 document.addEventListener('DOMContentLoaded', () => {
     setupNav();
     setupForms();
-    loadConfig().then(() => {
-        loadDashboard();
-        loadCatalogo();
+    loadBootstrap().then(() => {
         loadInventario();
         loadVentas();
         loadVendedores();
-        loadVendedoresCatalogo();
         loadCotizaciones();
-        loadProveedores(); // Ensure providers are loaded for Requisitions
     });
 });
 
+// Config, dashboard y catalogos de referencia en una sola peticion
+async function loadBootstrap() {
+    try {
+        const r = await fetch(`${API}/api/bootstrap`);
+        if (!r.ok) throw new Error(`HTTP ${r.status}`);
+        const b = await r.json();
+        await loadConfig(b.config);
+        loadDashboard(b.dashboard);
+        loadCatalogo(b.catalogos.equipos.data);
+        loadVendedoresCatalogo(b.catalogos.vendedores_catalogo.data);
+        loadProveedores(b.catalogos.proveedores.data); // Ensure providers are loaded for Requisitions
+    } catch (e) {
+        console.error('Error bootstrap:', e);
+        await loadConfig();
+        loadDashboard();
+        loadCatalogo();
+        loadVendedoresCatalogo();
+        loadProveedores();
+    }
+}
+
 // ===== NAVEGACION =====
 const sectionTitles = {
     dashboard: 'Dashboard',
@@ -80,10 +97,14 @@ function setupNav() {
 }
 
 // ===== CONFIGURACION =====
-async function loadConfig() {
+async function loadConfig(preloaded) {
     try {
-        const r = await fetch(`${API}/api/config`);
-        configData = await r.json();
+        if (preloaded) {
+            configData = preloaded;
+        } else {
+            const r = await fetch(`${API}/api/config`);
+            configData = await r.json();
+        }
         fillSelect('cat-categoria', configData.categorias);
         fillSelect('inv-filter-estado', configData.estados_inventario, true);
         fillSelect('venta-forma-pago', configData.formas_pago);
@@ -113,11 +134,15 @@ function fillSelect(id, options, addAll) {
 }
 
 // ===== DASHBOARD =====
-async function loadDashboard() {
+async function loadDashboard(preloaded) {
     try {
-        const r = await fetch(`${API}/api/dashboard`);
-        if (!r.ok) throw new Error(`HTTP ${r.status}`);
-        dashboardData = await r.json();
+        if (preloaded) {
+            dashboardData = preloaded;
+        } else {
+            const r = await fetch(`${API}/api/dashboard`);
+            if (!r.ok) throw new Error(`HTTP ${r.status}`);
+            dashboardData = await r.json();
+        }
         const d = dashboardData;
 
         document.getElementById('stat-no-facturado').textContent = money(d.ingreso_no_facturado);
@@ -342,11 +367,14 @@ function toggleMeses(anio) {
 }
 
 // ===== CATALOGO =====
-async function loadCatalogo() {
+async function loadCatalogo(preloaded) {
     try {
-        const r = await fetch(`${API}/api/equipos`);
-        if (!r.ok) throw new Error(`HTTP ${r.status}`);
-        const data = await r.json();
+        let data = preloaded;
+        if (!data) {
+            const r = await fetch(`${API}/api/equipos`);
+            if (!r.ok) throw new Error(`HTTP ${r.status}`);
+            data = await r.json();
+        }
         equiposCatalogo = Array.isArray(data) ? data : [];
         renderCatalogo();
         updateEquipoSelect();
@@ -773,7 +801,7 @@ async function openVenta(id) {
 // ===== VENTAS =====
 async function loadVentas() {
     try {
-        const r = await fetch(`${API}/api/ventas`);
+        const r = await fetch(`${API}/api/ventas?include=anticipos`);
         if (!r.ok) throw new Error(`HTTP ${r.status}`);
         const data = await r.json();
         ventasData = Array.isArray(data) ? data : [];
@@ -963,11 +991,15 @@ async function eliminarAnticipo(aid) {
 // ===== VENDEDORES CATALOGO =====
 let vendedoresCatalogoData = [];
 
-async function loadVendedoresCatalogo() {
+async function loadVendedoresCatalogo(preloaded) {
     try {
-        const r = await fetch(`${API}/api/vendedores/catalogo`);
-        if (!r.ok) throw new Error(`HTTP ${r.status}`);
-        vendedoresCatalogoData = await r.json();
+        if (preloaded) {
+            vendedoresCatalogoData = preloaded;
+        } else {
+            const r = await fetch(`${API}/api/vendedores/catalogo`);
+            if (!r.ok) throw new Error(`HTTP ${r.status}`);
+            vendedoresCatalogoData = await r.json();
+        }
         renderVendedoresCatalogo();
         populateVendedorDropdowns();
     } catch (e) {
@@ -1914,10 +1946,13 @@ function renderProveedores() {
 
 // ==================== REQUISICIONES ====================
 
-async function loadProveedores() {
+async function loadProveedores(preloaded) {
     try {
-        const res = await fetch(`${API}/api/proveedores`);
-        const data = await res.json();
+        let data = preloaded;
+        if (!data) {
+            const res = await fetch(`${API}/api/proveedores`);
+            data = await res.json();
+        }
         AVAILABLE_PROVIDERS = data; // Update global
         proveedoresData = data;
         renderProveedores();
@@ -310,6 +310,12 @@ def init_db():
     conn.commit()
     cursor.close()
     conn.close()
+
+    # Migraciones versionadas (migrations/*.sql), registradas en schema_migrations
+    import migrate
+    aplicadas = migrate.migrate()
+    print(f"  OK migraciones ({len(aplicadas)} aplicadas)")
+
     print("=" * 60)
     print("Base de datos inicializada correctamente")
     print("Tablas: equipos, inventario, ventas, cotizaciones, cotizacion_items, proveedores, plantillas_componentes, requisiciones, requisicion_items, equipo_partes")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Migraciones de esquema versionadas para Sistema Durtron
+
+Cada archivo migrations/NNNN_descripcion.sql se aplica una sola vez, en su
+propia transaccion, y queda registrado en la tabla schema_migrations. Un
+advisory lock de PostgreSQL garantiza que solo un proceso (worker de gunicorn,
+build de Render o este script) aplique las pendientes; si el esquema ya esta
+al dia, el arranque solo ejecuta una consulta.
+
+Uso:
+    python migrate.py            aplica las migraciones pendientes
+    python migrate.py --status   muestra la version actual y las pendientes
+"""
+
+import os
+import re
+import sys
+import time
+
+import psycopg2
+
+from db import get_db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATIONS_LOCK_ID = 7343001  # clave del pg_advisory_lock compartida por todos los procesos
+
+_FILE_RE = re.compile(r'^(\d{4})_([\w-]+)\.sql$')
+
+
+def load_migrations():
+    """Lista ordenada de (version, nombre, ruta) de los archivos en migrations/"""
+    found = []
+    for fname in os.listdir(MIGRATIONS_DIR):
+        m = _FILE_RE.match(fname)
+        if m:
+            found.append((int(m.group(1)), m.group(2), os.path.join(MIGRATIONS_DIR, fname)))
+    found.sort()
+    versions = [v for v, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise Exception(f"Versiones de migracion duplicadas en {MIGRATIONS_DIR}")
+    return found
+
+
+def _applied_summary(conn, cur):
+    """(cantidad, version maxima) registradas; (0, 0) si la tabla aun no existe"""
+    try:
+        cur.execute('SELECT COUNT(*) AS n, COALESCE(MAX(version), 0) AS v FROM schema_migrations')
+        row = cur.fetchone()
+        conn.rollback()
+        return row['n'], row['v']
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return 0, 0
+
+
+def migrate(verbose=True):
+    """Aplica las migraciones pendientes. Devuelve la lista de versiones aplicadas."""
+    migrations = load_migrations()
+    if not migrations:
+        return []
+
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        # Camino rapido: una sola consulta cuando el esquema ya esta al dia
+        n, v = _applied_summary(conn, cur)
+        if n == len(migrations) and v == migrations[-1][0]:
+            return []
+
+        cur.execute('SELECT pg_advisory_lock(%s)', (MIGRATIONS_LOCK_ID,))
+        conn.commit()
+        applied_now = []
+        try:
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    nombre VARCHAR(200) NOT NULL,
+                    fecha_aplicada TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    duracion_ms INTEGER
+                )
+            ''')
+            cur.execute('SELECT version FROM schema_migrations')
+            applied = {r['version'] for r in cur.fetchall()}
+            conn.commit()
+
+            for version, nombre, path in migrations:
+                if version in applied:
+                    continue
+                with open(path, encoding='utf-8') as f:
+                    sql = f.read()
+                t0 = time.monotonic()
+                try:
+                    cur.execute(sql)
+                    ms = int((time.monotonic() - t0) * 1000)
+                    cur.execute('INSERT INTO schema_migrations (version, nombre, duracion_ms) VALUES (%s, %s, %s)',
+                                (version, nombre, ms))
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    raise Exception(f"Migracion {version:04d}_{nombre} fallo: {e}")
+                applied_now.append(version)
+                if verbose:
+                    print(f"Migracion {version:04d}_{nombre} aplicada ({ms} ms)")
+        finally:
+            cur.execute('SELECT pg_advisory_unlock(%s)', (MIGRATIONS_LOCK_ID,))
+            conn.commit()
+        return applied_now
+    finally:
+        cur.close()
+        conn.close()
+
+
+def status():
+    migrations = load_migrations()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        try:
+            cur.execute('SELECT version FROM schema_migrations')
+            applied = {r['version'] for r in cur.fetchall()}
+        except psycopg2.errors.UndefinedTable:
+            applied = set()
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+    for version, nombre, _ in migrations:
+        marca = 'OK       ' if version in applied else 'PENDIENTE'
+        print(f"  {marca} {version:04d}_{nombre}")
+    pendientes = [v for v, _, _ in migrations if v not in applied]
+    print(f"Version actual: {max(applied) if applied else 0} | pendientes: {len(pendientes)}")
+    return pendientes
+
+
+if __name__ == '__main__':
+    try:
+        if '--status' in sys.argv:
+            status()
+        else:
+            aplicadas = migrate()
+            print(f"Migraciones aplicadas: {len(aplicadas)}" if aplicadas else "Esquema al dia")
+    except Exception as e:
+        print(f"FALLO: {e}")
+        sys.exit(1)
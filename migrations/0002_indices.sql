@@ -0,0 +1,28 @@
+-- Indices secundarios para las consultas frecuentes de app.py.
+-- Las tablas de Durtron son chicas, por eso se crean sin CONCURRENTLY
+-- (cada migracion corre dentro de una transaccion).
+
+-- ventas: borrado de equipos/inventario (FK) y busquedas por unidad
+CREATE INDEX IF NOT EXISTS idx_ventas_equipo_id ON ventas (equipo_id);
+CREATE INDEX IF NOT EXISTS idx_ventas_inventario_id ON ventas (inventario_id);
+-- ventas: listado ordenado por fecha y filtros por rango de fechas
+CREATE INDEX IF NOT EXISTS idx_ventas_fecha_venta ON ventas (fecha_venta DESC, id DESC);
+
+-- anticipos de cada venta (listado de ventas, recalculo de saldo)
+CREATE INDEX IF NOT EXISTS idx_anticipos_venta_id ON anticipos (venta_id, fecha);
+
+-- inventario: filtros por estado y listado de unidades no vendidas
+CREATE INDEX IF NOT EXISTS idx_inventario_estado_fecha ON inventario (estado, fecha_creacion DESC);
+CREATE INDEX IF NOT EXISTS idx_inventario_no_vendida ON inventario (fecha_creacion DESC) WHERE estado <> 'Vendida';
+CREATE INDEX IF NOT EXISTS idx_inventario_equipo_id ON inventario (equipo_id);
+
+-- partidas de cotizaciones y requisiciones
+CREATE INDEX IF NOT EXISTS idx_cotizacion_items_cotizacion_id ON cotizacion_items (cotizacion_id);
+CREATE INDEX IF NOT EXISTS idx_requisicion_items_req_proveedor ON requisicion_items (requisicion_id, LOWER(proveedor_nombre));
+CREATE INDEX IF NOT EXISTS idx_requisicion_envios_req ON requisicion_envios (requisicion_id, proveedor_nombre);
+
+-- partes por equipo y proveedor (orden de compra por proveedor)
+CREATE INDEX IF NOT EXISTS idx_equipo_partes_equipo_proveedor ON equipo_partes (equipo_id, proveedor_id);
+
+-- proveedores buscados por razon social (envio de requisiciones)
+CREATE INDEX IF NOT EXISTS idx_proveedores_razon_social ON proveedores (razon_social);
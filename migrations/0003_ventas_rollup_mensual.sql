@@ -0,0 +1,43 @@
+-- Acumulado mensual de ventas para /api/dashboard.
+-- app.py lo mantiene al dia dentro de las transacciones de vender_item,
+-- update_venta, delete_venta, reset_inventario y update_equipo (costo).
+-- Montos sin IVA; el dashboard aplica el 1.16 a lo facturado al leer.
+
+CREATE TABLE IF NOT EXISTS ventas_rollup_mensual (
+    anio INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    equipo_id INTEGER NOT NULL,
+    vendedor VARCHAR(100) NOT NULL,
+    num_ventas INTEGER NOT NULL DEFAULT 0,
+    monto_no_facturado DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    monto_facturado DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    costo DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (anio, mes, equipo_id, vendedor)
+);
+CREATE INDEX IF NOT EXISTS idx_ventas_rollup_equipo ON ventas_rollup_mensual (equipo_id);
+
+-- Reconstruye el acumulado desde ventas (backfill o correccion manual:
+-- "flask --app app rollup-rebuild")
+CREATE OR REPLACE FUNCTION ventas_rollup_rebuild() RETURNS INTEGER AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    LOCK TABLE ventas IN SHARE MODE;
+    DELETE FROM ventas_rollup_mensual;
+    INSERT INTO ventas_rollup_mensual (anio, mes, equipo_id, vendedor, num_ventas,
+                                       monto_no_facturado, monto_facturado, costo)
+    SELECT EXTRACT(YEAR FROM f.fecha)::int, EXTRACT(MONTH FROM f.fecha)::int, v.equipo_id, v.vendedor,
+           COUNT(*),
+           COALESCE(SUM(CASE WHEN v.facturado THEN 0 ELSE v.precio_venta END), 0),
+           COALESCE(SUM(CASE WHEN v.facturado THEN v.precio_venta ELSE 0 END), 0),
+           COALESCE(SUM(e.precio_costo), 0)
+    FROM ventas v
+    LEFT JOIN equipos e ON v.equipo_id = e.id
+    CROSS JOIN LATERAL (SELECT COALESCE(v.fecha_venta, v.fecha_creacion::date, CURRENT_DATE) AS fecha) f
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ventas_rollup_rebuild();
@@ -0,0 +1,7 @@
+-- Contadores de version para respuestas cacheadas (ETag compartido entre workers)
+CREATE TABLE IF NOT EXISTS cache_versiones (
+    clave VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO cache_versiones (clave) VALUES ('dashboard') ON CONFLICT (clave) DO NOTHING;
@@ -0,0 +1,12 @@
+-- Indices con desempate por id para la paginacion keyset de los listados
+-- (ORDER BY <fecha> DESC, id DESC / nombre, id).
+
+DROP INDEX IF EXISTS idx_inventario_no_vendida;
+CREATE INDEX IF NOT EXISTS idx_inventario_no_vendida ON inventario (fecha_creacion DESC, id DESC) WHERE estado <> 'Vendida';
+DROP INDEX IF EXISTS idx_inventario_estado_fecha;
+CREATE INDEX IF NOT EXISTS idx_inventario_estado_fecha ON inventario (estado, fecha_creacion DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_ventas_vendedor_fecha ON ventas (vendedor, fecha_venta DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_cotizaciones_fecha ON cotizaciones (fecha_creacion DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_requisiciones_fecha ON requisiciones (fecha_creacion DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_equipos_nombre ON equipos (nombre, id);
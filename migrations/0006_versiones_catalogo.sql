@@ -0,0 +1,4 @@
+-- Sellos de version de los catalogos (ETag / Last-Modified en sus GET)
+INSERT INTO cache_versiones (clave) VALUES
+    ('equipos'), ('proveedores'), ('vendedores_catalogo'), ('plantillas')
+ON CONFLICT (clave) DO NOTHING;
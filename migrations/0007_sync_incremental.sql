@@ -0,0 +1,53 @@
+-- Sincronizacion incremental (/api/sync).
+-- Cada fila guarda en sync_xid el id de la transaccion que la escribio y en
+-- updated_at la hora; los borrados dejan una lapida en sync_eliminados.
+-- Las filas existentes quedan con sync_xid 0 (entran en la primera sync completa).
+
+CREATE TABLE IF NOT EXISTS sync_eliminados (
+    tabla VARCHAR(30) NOT NULL,
+    registro_id INTEGER NOT NULL,
+    sync_xid BIGINT NOT NULL,
+    eliminado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tabla, registro_id)
+);
+CREATE INDEX IF NOT EXISTS idx_sync_eliminados_xid ON sync_eliminados (tabla, sync_xid);
+
+CREATE OR REPLACE FUNCTION sync_marcar() RETURNS trigger AS $$
+BEGIN
+    NEW.sync_xid := pg_current_xact_id()::text::bigint;
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_lapida() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO sync_eliminados (tabla, registro_id, sync_xid)
+    VALUES (TG_TABLE_NAME, OLD.id, pg_current_xact_id()::text::bigint)
+    ON CONFLICT (tabla, registro_id)
+    DO UPDATE SET sync_xid = EXCLUDED.sync_xid, eliminado = CURRENT_TIMESTAMP;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['equipos', 'inventario', 'ventas', 'proveedores', 'requisiciones'] LOOP
+        EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP', t);
+        EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS sync_xid BIGINT NOT NULL DEFAULT 0', t);
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (sync_xid)', 'idx_' || t || '_sync_xid', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || t || '_sync', t);
+        EXECUTE format('CREATE TRIGGER %I BEFORE INSERT OR UPDATE ON %I FOR EACH ROW EXECUTE FUNCTION sync_marcar()',
+                       'trg_' || t || '_sync', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || t || '_lapida', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON %I FOR EACH ROW EXECUTE FUNCTION sync_lapida()',
+                       'trg_' || t || '_lapida', t);
+    END LOOP;
+END;
+$$;
+
+-- Horizonte de lapidas purgadas (flask --app app sync-purge): un token
+-- anterior a este valor ya no puede sincronizarse por diferencias
+INSERT INTO cache_versiones (clave, version) VALUES ('sync_horizonte', 0) ON CONFLICT (clave) DO NOTHING;
@@ -0,0 +1,79 @@
+-- Busqueda (/api/search): tsvector en espanol sin acentos y trigramas (pg_trgm).
+-- Si el servidor no permite crear las extensiones la busqueda sigue funcionando:
+-- los acentos se quitan con translate() y las coincidencias parciales usan LIKE
+-- sin indice ni tolerancia a errores de escritura.
+
+DO $$
+BEGIN
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS unaccent;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE NOTICE 'unaccent no disponible: %', SQLERRM;
+    END;
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE NOTICE 'pg_trgm no disponible: %', SQLERRM;
+    END;
+END;
+$$;
+
+-- Quitar acentos debe ser IMMUTABLE para poder indexarse
+DO $$
+DECLARE
+    esquema TEXT;
+BEGIN
+    SELECT n.nspname INTO esquema
+    FROM pg_extension x JOIN pg_namespace n ON n.oid = x.extnamespace
+    WHERE x.extname = 'unaccent';
+    IF esquema IS NOT NULL THEN
+        EXECUTE format($f$
+            CREATE OR REPLACE FUNCTION durtron_unaccent(texto TEXT) RETURNS TEXT AS $b$
+                SELECT %I.unaccent(%L::regdictionary, texto)
+            $b$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        $f$, esquema, esquema || '.unaccent');
+    ELSE
+        CREATE OR REPLACE FUNCTION durtron_unaccent(texto TEXT) RETURNS TEXT AS $b$
+            SELECT translate(texto, 'áéíóúüñÁÉÍÓÚÜÑàèìòùÀÈÌÒÙ', 'aeiouunAEIOUUNaeiouAEIOU')
+        $b$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+    END IF;
+END;
+$$;
+
+-- Documento de texto completo y clave para trigramas. app.py usa exactamente
+-- estas expresiones en /api/search para que el planner use los indices.
+CREATE OR REPLACE FUNCTION busqueda_doc(VARIADIC partes TEXT[]) RETURNS tsvector AS $$
+    SELECT to_tsvector('spanish'::regconfig, durtron_unaccent(array_to_string(partes, ' ')))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION busqueda_clave(VARIADIC partes TEXT[]) RETURNS TEXT AS $$
+    SELECT lower(durtron_unaccent(array_to_string(partes, ' ')))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE INDEX IF NOT EXISTS idx_equipos_busqueda ON equipos
+    USING GIN (busqueda_doc(nombre, modelo, codigo, especificaciones));
+CREATE INDEX IF NOT EXISTS idx_ventas_busqueda ON ventas
+    USING GIN (busqueda_doc(cliente_nombre));
+CREATE INDEX IF NOT EXISTS idx_cotizaciones_busqueda ON cotizaciones
+    USING GIN (busqueda_doc(cliente_empresa));
+
+DO $$
+DECLARE
+    esquema TEXT;
+BEGIN
+    SELECT n.nspname INTO esquema
+    FROM pg_extension x JOIN pg_namespace n ON n.oid = x.extnamespace
+    WHERE x.extname = 'pg_trgm';
+    IF esquema IS NULL THEN
+        RETURN;
+    END IF;
+    EXECUTE format('CREATE INDEX IF NOT EXISTS idx_equipos_busqueda_trgm ON equipos
+                    USING GIN (busqueda_clave(nombre, modelo, codigo) %I.gin_trgm_ops)', esquema);
+    EXECUTE format('CREATE INDEX IF NOT EXISTS idx_inventario_busqueda_trgm ON inventario
+                    USING GIN (busqueda_clave(numero_serie) %I.gin_trgm_ops)', esquema);
+    EXECUTE format('CREATE INDEX IF NOT EXISTS idx_ventas_busqueda_trgm ON ventas
+                    USING GIN (busqueda_clave(cliente_nombre, cliente_rfc) %I.gin_trgm_ops)', esquema);
+    EXECUTE format('CREATE INDEX IF NOT EXISTS idx_cotizaciones_busqueda_trgm ON cotizaciones
+                    USING GIN (busqueda_clave(folio, cliente_empresa) %I.gin_trgm_ops)', esquema);
+END;
+$$;
@@ -0,0 +1,28 @@
+-- Cola de correos salientes (correo.py). Las rutas insertan aqui en su propia
+-- transaccion y un worker los envia: si el proceso web se recicla el correo
+-- sigue en la tabla y otro worker lo toma.
+-- estado: pendiente -> enviando -> enviado | error (sin mas reintentos).
+-- proximo_intento: cuando puede tomarse; mientras esta 'enviando' es el fin
+-- del lease (si el worker muere, al vencer vuelve a tomarse).
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id SERIAL PRIMARY KEY,
+    tipo VARCHAR(30) NOT NULL,
+    requisicion_id INTEGER REFERENCES requisiciones(id) ON DELETE SET NULL,
+    destinatario VARCHAR(255) NOT NULL,
+    asunto VARCHAR(255) NOT NULL,
+    texto TEXT NOT NULL,
+    adjuntos JSONB NOT NULL DEFAULT '[]',
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ultimo_error TEXT,
+    proveedor_id VARCHAR(100),
+    creado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    enviado TIMESTAMP
+);
+
+-- Solo lo que falta enviar: el worker consulta este indice en cada vuelta
+CREATE INDEX IF NOT EXISTS idx_email_outbox_cola ON email_outbox (proximo_intento)
+    WHERE estado IN ('pendiente', 'enviando');
+CREATE INDEX IF NOT EXISTS idx_email_outbox_requisicion ON email_outbox (requisicion_id, id);
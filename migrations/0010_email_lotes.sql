@@ -0,0 +1,13 @@
+-- Lotes de /emails/batch (correo.py).
+-- lote: Idempotency-Key del lote con que salio el correo. Si el lote se
+-- reintenta se manda igual y con la misma llave, asi Resend no duplica un
+-- lote que si se envio pero cuya respuesta se perdio.
+-- individual: el lote fue rechazado entero por un error definitivo (Resend
+-- responde 422 al lote completo si un solo destinatario es invalido); el
+-- correo se manda solo y el error queda unicamente en el que lo causo.
+
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS lote VARCHAR(64);
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS individual BOOLEAN NOT NULL DEFAULT false;
+
+CREATE INDEX IF NOT EXISTS idx_email_outbox_lote ON email_outbox (lote)
+    WHERE lote IS NOT NULL AND estado IN ('pendiente', 'enviando');
@@ -0,0 +1,18 @@
+-- Columnas de orden de la paginacion keyset (paged_query en app.py): el cursor
+-- compara (fecha, id) < (%s, %s) y con una fecha NULL la comparacion da NULL,
+-- asi que el listado se cortaba en la primera pagina que terminara en una fila
+-- sin fecha. Se rellenan las filas viejas o importadas y se vuelven NOT NULL.
+-- ventas.fecha_venta se rellena con la misma expresion que usa el rollup
+-- mensual (0003), asi los acumulados no cambian.
+
+UPDATE ventas SET fecha_venta = COALESCE(fecha_creacion::date, CURRENT_DATE) WHERE fecha_venta IS NULL;
+ALTER TABLE ventas ALTER COLUMN fecha_venta SET NOT NULL;
+
+UPDATE inventario SET fecha_creacion = COALESCE(fecha_ingreso::timestamp, CURRENT_TIMESTAMP) WHERE fecha_creacion IS NULL;
+ALTER TABLE inventario ALTER COLUMN fecha_creacion SET NOT NULL;
+
+UPDATE cotizaciones SET fecha_creacion = COALESCE(fecha_cotizacion::timestamp, CURRENT_TIMESTAMP) WHERE fecha_creacion IS NULL;
+ALTER TABLE cotizaciones ALTER COLUMN fecha_creacion SET NOT NULL;
+
+UPDATE requisiciones SET fecha_creacion = CURRENT_TIMESTAMP WHERE fecha_creacion IS NULL;
+ALTER TABLE requisiciones ALTER COLUMN fecha_creacion SET NOT NULL;
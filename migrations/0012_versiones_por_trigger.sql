@@ -0,0 +1,32 @@
+-- Sellos de los catalogos (0006) incrementados por la base: cualquier escritura
+-- sobre la tabla (rutas, importar_catalogo_render.py, SQL a mano) cambia la
+-- version en la misma transaccion, asi ningun cliente recibe 304 de un
+-- catalogo que ya cambio. Un disparador por sentencia, no por fila: una carga
+-- masiva incrementa una vez por sentencia.
+
+CREATE OR REPLACE FUNCTION cache_version_bump() RETURNS trigger AS $$
+BEGIN
+    UPDATE cache_versiones SET version = version + 1, actualizado = CURRENT_TIMESTAMP
+    WHERE clave = TG_ARGV[0];
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    par TEXT[];
+BEGIN
+    -- {tabla, clave en cache_versiones}
+    FOREACH par SLICE 1 IN ARRAY ARRAY[
+        ['equipos', 'equipos'],
+        ['proveedores', 'proveedores'],
+        ['vendedores_catalogo', 'vendedores_catalogo'],
+        ['plantillas_componentes', 'plantillas']
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || par[1] || '_version', par[1]);
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION cache_version_bump(%L)',
+                       'trg_' || par[1] || '_version', par[1], par[2]);
+    END LOOP;
+END;
+$$;
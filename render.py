@@ -0,0 +1,1106 @@
+"""Motor de render de etiquetas y ordenes de compra para Sistema Durtron
+
+Cada documento se describe con elementos declarativos (Texto, Linea, Rect).
+Cada plantilla tiene una parte fija (encabezado, cajas, pie) que se rasteriza
+una sola vez por proceso; en cada llamada solo se dibujan los valores. Las
+fuentes TrueType tambien se cargan una sola vez por proceso.
+
+Las ordenes de compra se arman como Paginado (encabezado, filas, cierre):
+PNG, SVG y ZPL las apilan en una sola hoja; el PDF vectorial reparte la tabla
+en paginas tamano carta.
+
+Las funciones de layout reciben y devuelven datos simples (dicts, tuplas),
+asi se pueden ejecutar en otro proceso.
+
+Los archivos generados se guardan en una cache en disco (RENDER_CACHE_DIR)
+compartida por los workers. La clave es un hash del documento ya armado:
+plantilla, valores y RENDER_VERSION.
+
+Todo lo que no esta en cache se genera en un pool acotado de procesos del
+tamano de los nucleos (RENDER_WORKERS), con menor prioridad que los workers
+web: el render pesado no bloquea al resto de la API ni la deja sin CPU.
+"""
+
+import fcntl
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import lru_cache
+
+from xml.sax.saxutils import escape
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+try:
+    from fontTools import subset as ft_subset
+    from fontTools.ttLib import TTFont
+except ImportError:  # sin fontTools el PDF usa Helvetica del visor (sin incrustar)
+    ft_subset = None
+else:
+    logging.getLogger('fontTools').setLevel(logging.WARNING)  # el subset reporta cada tabla en INFO
+
+logger = logging.getLogger(__name__)
+
+# Subir si cambia el codigo de dibujo; los cambios a las plantillas ya cambian la clave
+RENDER_VERSION = 1
+RENDER_CACHE_DIR = os.environ.get('RENDER_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'durtron_render')
+RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_MB', 256)) * 1024 * 1024  # 0 = sin cache
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 0)) or os.cpu_count() or 1
+RENDER_NICE = 5
+ZPL_DPI = int(os.environ.get('ZPL_DPI', 203))  # resolucion de la impresora termica
+
+FUENTES = {
+    'regular': '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    'bold': '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+}
+
+Texto = namedtuple('Texto', 'xy texto color fuente size')
+Linea = namedtuple('Linea', 'puntos color ancho')
+Rect = namedtuple('Rect', 'caja fill outline ancho', defaults=(None, None, 1))
+# plantilla: clave en PLANTILLAS con la parte fija; elementos: lo variable
+Documento = namedtuple('Documento', 'plantilla ancho alto elementos')
+
+
+@lru_cache(maxsize=None)
+def fuente(estilo, size):
+    try:
+        return ImageFont.truetype(FUENTES[estilo], size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def _bitonal(color):
+    """Blanco o negro para impresion termica: cualquier tinta que no sea blanca es negra"""
+    if color is None:
+        return None
+    return 255 if ImageColor.getcolor(color, 'L') >= 250 else 0
+
+
+def dibujar(draw, elementos, modo=None):
+    tinta = _bitonal if modo == '1' else (lambda color: color)
+    for el in elementos:
+        if isinstance(el, Texto):
+            draw.text(el.xy, el.texto, fill=tinta(el.color), font=fuente(el.fuente, el.size))
+        elif isinstance(el, Linea):
+            draw.line(el.puntos, fill=tinta(el.color), width=el.ancho)
+        elif isinstance(el, Rect):
+            draw.rectangle(el.caja, fill=tinta(el.fill), outline=tinta(el.outline), width=el.ancho)
+
+
+# ==================== ETIQUETA 800x420 ====================
+ETIQUETA_ANCHO, ETIQUETA_ALTO = 800, 420
+ETIQUETA_DPI = 200  # 800x420 px = 4 x 2.1 pulgadas al imprimir
+ETIQUETA_CAMPOS = [
+    ('equipo', 'Equipo'),
+    ('apertura', 'Apertura'),
+    ('peso', 'Peso del Equipo'),
+    ('modelo', 'Modelo'),
+    ('tamano_alimentacion', 'Tamano de Alimentacion'),
+    ('fecha_fabricacion', 'Fecha de Fabricacion'),
+    ('capacidad', 'Capacidad'),
+    ('potencia', 'Potencia'),
+    ('numero_serie', 'Numero de Serie'),
+]
+_ETQ_COL_W = (ETIQUETA_ANCHO - 60) // 3
+_ETQ_START_Y = 85
+_ETQ_ROW_H = 65
+
+
+def _etiqueta_celda(idx):
+    """(x, y de la caja) del campo idx en la rejilla de 3x3"""
+    x = 30 + (idx % 3) * _ETQ_COL_W
+    y = _ETQ_START_Y + (idx // 3) * _ETQ_ROW_H
+    return x, y + 16
+
+
+def _etiqueta_fija():
+    W = ETIQUETA_ANCHO
+    elementos = [
+        Texto((30, 20), 'DURTRON', '#000000', 'bold', 28),
+        Texto((30, 52), 'INNOVACION INDUSTRIAL', '#555555', 'regular', 12),
+        Texto((550, 20), 'Calidad Industrial', '#333333', 'bold', 11),
+        Texto((550, 38), 'Durtron Planta 1 Durango', '#555555', 'bold', 11),
+        Linea([(25, 72), (W - 25, 72)], '#000000', 2),
+    ]
+    for idx, (_, label) in enumerate(ETIQUETA_CAMPOS):
+        x, box_y = _etiqueta_celda(idx)
+        elementos.append(Texto((x, box_y - 16), label, '#666666', 'regular', 11))
+        elementos.append(Rect([(x, box_y), (x + _ETQ_COL_W - 15, box_y + 28)], outline='#000000'))
+    footer_y = _ETQ_START_Y + 3 * _ETQ_ROW_H + 15
+    elementos += [
+        Linea([(25, footer_y), (W - 25, footer_y)], '#000000', 1),
+        Texto((30, footer_y + 10), '6181341056', '#333333', 'regular', 10),
+        Texto((280, footer_y + 10), 'contacto@durtron.com', '#333333', 'regular', 10),
+        Texto((560, footer_y + 10), 'www.durtron.com', '#333333', 'regular', 10),
+    ]
+    return elementos
+
+
+def etiqueta(valores):
+    """Etiqueta de equipo; valores usa las claves de ETIQUETA_CAMPOS"""
+    elementos = []
+    for idx, (clave, _) in enumerate(ETIQUETA_CAMPOS):
+        x, box_y = _etiqueta_celda(idx)
+        valor = str(valores.get(clave) or '-')[:25]  # Truncar si es muy largo
+        elementos.append(Texto((x + 6, box_y + 6), valor, '#000000', 'bold', 13))
+    return Documento('etiqueta', ETIQUETA_ANCHO, ETIQUETA_ALTO, elementos)
+
+
+# ==================== DOCUMENTOS CON TABLA ====================
+# Las ordenes de compra son un encabezado, una tabla de largo variable y un
+# cierre (totales, pie). En PNG se apilan en una sola imagen (aplanar); en PDF
+# la tabla se reparte en paginas. encabezado va en coordenadas absolutas; los
+# titulos, cada fila y el cierre son relativos a su propia y=0.
+Paginado = namedtuple('Paginado', 'plantilla ancho alto encabezado y_tabla titulos titulos_alto '
+                                  'filas fila_alto cierre')
+
+
+def mover(elementos, dy):
+    """Copia de los elementos desplazada dy pixeles hacia abajo"""
+    movidos = []
+    for el in elementos:
+        if isinstance(el, Texto):
+            movidos.append(el._replace(xy=(el.xy[0], el.xy[1] + dy)))
+        elif isinstance(el, Linea):
+            movidos.append(el._replace(puntos=[(x, y + dy) for x, y in el.puntos]))
+        elif isinstance(el, Rect):
+            movidos.append(el._replace(caja=[(x, y + dy) for x, y in el.caja]))
+    return movidos
+
+
+def aplanar(doc):
+    """Documento de una sola pieza (para raster, SVG y ZPL)"""
+    if not isinstance(doc, Paginado):
+        return doc
+    el = list(doc.encabezado) + mover(doc.titulos, doc.y_tabla)
+    y = doc.y_tabla + doc.titulos_alto
+    for fila in doc.filas:
+        el += mover(fila, y)
+        y += doc.fila_alto
+    el += mover(doc.cierre, y)
+    return Documento(doc.plantilla, doc.ancho, doc.alto, el)
+
+
+# ==================== ORDEN DE COMPRA POR PROVEEDOR (EQUIPO) ====================
+ORDEN_EQUIPO_ANCHO = 800
+ORDEN_EQUIPO_FILA = 30
+# (x, titulo, clave, max caracteres, color)
+ORDEN_EQUIPO_COLUMNAS = [
+    (30, '#', None, None, '#333333'),
+    (60, 'PARTE / COMPONENTE', 'nombre_parte', 40, '#000000'),
+    (400, 'DESCRIPCION', 'descripcion', 25, '#666666'),
+    (620, 'CANT.', 'cantidad', None, '#000000'),
+    (700, 'UNIDAD', 'unidad', None, '#000000'),
+]
+PIE_DURTRON = "DURTRON - Innovacion Industrial | Av. del Sol #329, Durango, Dgo. | Tel: 618 134 1056"
+
+
+def _orden_equipo_fija():
+    W = ORDEN_EQUIPO_ANCHO
+    return [
+        Rect([(0, 0), (W, 70)], fill='#1a1a2e'),
+        Texto((20, 15), 'DURTRON', '#D2152B', 'bold', 20),
+        Texto((20, 42), 'Innovacion Industrial', '#8888a4', 'regular', 10),
+        Texto((W - 250, 15), 'SOLICITUD DE COTIZACION', '#FFFFFF', 'bold', 13),
+    ]
+
+
+def orden_equipo(equipo, prov, partes, fecha=None):
+    """Solicitud de cotizacion con las partes de un equipo para un proveedor"""
+    W = ORDEN_EQUIPO_ANCHO
+    fecha = fecha or datetime.now()
+    el = [Texto((W - 250, 38), f"Fecha: {fecha.strftime('%d/%m/%Y')}", '#cccccc', 'regular', 10)]
+
+    y = 85
+    info = [('Proyecto / Equipo:', f"{equipo.get('nombre', '')} ({equipo.get('codigo', '')})"),
+            ('Proveedor:', f"{prov.get('razon_social', '')}")]
+    if prov.get('contacto_nombre'):
+        info.append(('Contacto:', f"{prov.get('contacto_nombre', '')}"))
+    for label, valor in info:
+        el.append(Texto((20, y), label, '#666666', 'regular', 10))
+        el.append(Texto((150, y), valor, '#000000', 'regular', 12))
+        y += 22
+    y += 10
+    el.append(Linea([(20, y), (W - 20, y)], '#D2152B', 2))
+    y_tabla = y + 15
+
+    titulos = [Rect([(20, 0), (W - 20, 28)], fill='#f0f0f0')]
+    for x, titulo, _, _, _ in ORDEN_EQUIPO_COLUMNAS:
+        titulos.append(Texto((x, 7), titulo, '#333333', 'bold', 13))
+
+    filas = []
+    for i, p in enumerate(partes):
+        bg = '#FFFFFF' if i % 2 == 0 else '#f8f8f8'
+        fila = [Rect([(20, 0), (W - 20, ORDEN_EQUIPO_FILA)], fill=bg)]
+        for x, _, clave, largo, color in ORDEN_EQUIPO_COLUMNAS:
+            if clave is None:
+                valor = str(i + 1)
+            elif clave == 'cantidad':
+                valor = str(p.get('cantidad', 1))
+            elif clave == 'unidad':
+                valor = str(p.get('unidad', 'pza'))
+            else:
+                valor = str(p.get(clave, ''))[:largo]
+            fila.append(Texto((x, 8), valor, color, 'regular', 12))
+        filas.append(fila)
+
+    cierre = [
+        Linea([(20, 0), (W - 20, 0)], '#cccccc', 1),
+        Texto((20, 20), PIE_DURTRON, '#999999', 'regular', 10),
+        Texto((20, 35), "Este documento es una solicitud de cotizacion. "
+                        "Favor de responder con precios y tiempos de entrega.", '#999999', 'regular', 10),
+    ]
+    return Paginado('orden_equipo', W, 400 + len(partes) * ORDEN_EQUIPO_FILA, el, y_tabla, titulos, 30,
+                    filas, ORDEN_EQUIPO_FILA, cierre)
+
+
+# ==================== ORDEN DE COMPRA POR PROVEEDOR (REQUISICION) ====================
+ORDEN_REQ_ANCHO = 820
+ORDEN_REQ_FILA = 32
+ORDEN_REQ_COLUMNAS = [20, 50, 280, 460, 530, 610, 720]
+ORDEN_REQ_TITULOS = ['#', 'COMPONENTE', 'COMENTARIOS', 'CANT.', 'P.UNIT', 'SUBTOTAL', 'IVA']
+
+
+def _orden_req_fija():
+    W = ORDEN_REQ_ANCHO
+    return [
+        Rect([(0, 0), (W, 70)], fill='#1a1a2e'),
+        Texto((20, 12), 'DURTRON', '#D2152B', 'bold', 22),
+        Texto((20, 42), 'Innovacion Industrial', '#8888a4', 'regular', 10),
+        Texto((W - 280, 12), 'SOLICITUD DE COTIZACION', '#FFFFFF', 'bold', 12),
+        Rect([(0, 70), (W, 74)], fill='#F47427'),
+    ]
+
+
+def orden_requisicion_filas(items):
+    """(cantidad, precio, subtotal, tiene_iva) por item y total con IVA"""
+    filas = []
+    total_general = 0
+    for item in items:
+        cant = float(item.get('cantidad', 1) or 1)
+        precio = float(item.get('precio_unitario', 0) or 0)
+        subtotal = cant * precio
+        tiene_iva = item.get('tiene_iva', False)
+        total_general += subtotal * 1.16 if tiene_iva else subtotal
+        filas.append((cant, precio, subtotal, tiene_iva))
+    return filas, total_general
+
+
+def orden_requisicion(req, prov_name, items, fecha=None):
+    """Solicitud de cotizacion con los items de una requisicion para un proveedor"""
+    W = ORDEN_REQ_ANCHO
+    fecha = fecha or datetime.now()
+    cols = ORDEN_REQ_COLUMNAS
+    el = [
+        Texto((W - 280, 30), f"Folio: {req.get('folio', '-')}", '#F47427', 'regular', 11),
+        Texto((W - 280, 48), f"Fecha: {fecha.strftime('%d/%m/%Y')}", '#cccccc', 'regular', 10),
+    ]
+
+    y = 90
+    for label, valor in [('PROVEEDOR:', prov_name),
+                         ('PROYECTO:', req.get('equipo_nombre', '-') or '-'),
+                         ('AREA:', req.get('area', '-') or '-'),
+                         ('NO. CONTROL:', req.get('no_control', '-') or '-')]:
+        el.append(Texto((20, y), label, '#888888', 'bold', 10))
+        el.append(Texto((130, y), valor, '#000000', 'regular', 11))
+        y += 20
+    el += [
+        Texto((20, y), 'EMITIDO POR:', '#888888', 'bold', 10),
+        Texto((130, y), req.get('emitido_por', '-') or '-', '#000000', 'regular', 11),
+        Texto((400, y), 'APROBADO POR:', '#888888', 'bold', 10),
+        Texto((520, y), req.get('aprobado_por', '-') or '-', '#000000', 'regular', 11),
+    ]
+    y += 25
+    el.append(Linea([(20, y), (W - 20, y)], '#D2152B', 2))
+    y_tabla = y + 12
+
+    titulos = [Rect([(20, 0), (W - 20, 28)], fill='#1a1a2e')]
+    for x, titulo in zip(cols, ORDEN_REQ_TITULOS):
+        titulos.append(Texto((x + 5, 8), titulo, '#FFFFFF', 'bold', 12))
+
+    montos, total_general = orden_requisicion_filas(items)
+    filas = []
+    for i, (item, (cant, precio, subtotal, tiene_iva)) in enumerate(zip(items, montos)):
+        bg = '#FFFFFF' if i % 2 == 0 else '#f5f5f5'
+        fila = [Rect([(20, 0), (W - 20, ORDEN_REQ_FILA)], fill=bg)]
+        valores = [
+            (str(i + 1), '#333'),
+            (str(item.get('componente', ''))[:30], '#000'),
+            (str(item.get('comentario', ''))[:22], '#666'),
+            (str(int(cant) if cant == int(cant) else cant), '#000'),
+            (f"${precio:,.2f}", '#000'),
+            (f"${subtotal:,.2f}", '#000'),
+            ("Si" if tiene_iva else "No", '#000'),
+        ]
+        for x, (valor, color) in zip(cols, valores):
+            fila.append(Texto((x + 5, 9), valor, color, 'regular', 11))
+        filas.append(fila)
+
+    cierre = [
+        Linea([(20, 0), (W - 20, 0)], '#1a1a2e', 2),
+        Rect([(W - 250, 10), (W - 20, 38)], fill='#1a1a2e'),
+        Texto((W - 245, 17), f"TOTAL: ${total_general:,.2f}", '#F47427', 'bold', 12),
+    ]
+    y = 55
+    if req.get('notas'):
+        cierre.append(Texto((20, y), 'NOTAS:', '#888888', 'bold', 10))
+        cierre.append(Texto((80, y), str(req.get('notas', ''))[:80], '#333', 'regular', 10))
+        y += 20
+    cierre.append(Texto((20, y), PIE_DURTRON, '#999999', 'regular', 10))
+    cierre.append(Texto((20, y + 15), "Favor de responder con precios y tiempos de entrega.", '#999999', 'regular', 10))
+    alto = 300 + len(items) * ORDEN_REQ_FILA + 60 + 120
+    return Paginado('orden_requisicion', W, alto, el, y_tabla, titulos, 30,
+                    filas, ORDEN_REQ_FILA, cierre)
+
+
+# ==================== RASTER ====================
+# plantilla -> (modo PIL, ancho, alto de la parte fija, elementos fijos).
+# La etiqueta solo usa grises: en modo 'L' el PNG pesa la mitad y se codifica
+# en menos de la mitad del tiempo, con los mismos valores de pixel.
+PLANTILLAS = {
+    'etiqueta': ('L', ETIQUETA_ANCHO, ETIQUETA_ALTO, _etiqueta_fija()),
+    'orden_equipo': ('RGB', ORDEN_EQUIPO_ANCHO, 71, _orden_equipo_fija()),
+    'orden_requisicion': ('RGB', ORDEN_REQ_ANCHO, 75, _orden_req_fija()),
+}
+
+
+@lru_cache(maxsize=None)
+def _fija(plantilla, modo=None):
+    """Parte fija de la plantilla ya rasterizada (una vez por proceso y modo)"""
+    modo_base, ancho, alto, elementos = PLANTILLAS[plantilla]
+    img = Image.new(modo or modo_base, (ancho, alto), 255 if modo == '1' else '#FFFFFF')
+    dibujar(ImageDraw.Draw(img), elementos, modo)
+    return img
+
+
+def a_imagen(doc, modo=None):
+    """modo '1': blanco y negro sin antialias, como lo imprime una termica"""
+    doc = aplanar(doc)
+    fija = _fija(doc.plantilla, modo)
+    if fija.size == (doc.ancho, doc.alto):
+        img = fija.copy()
+    else:
+        img = Image.new(fija.mode, (doc.ancho, doc.alto), 255 if modo == '1' else '#FFFFFF')
+        img.paste(fija, (0, 0))
+    dibujar(ImageDraw.Draw(img), doc.elementos, modo)
+    return img
+
+
+def a_png(doc):
+    buf = io.BytesIO()
+    a_imagen(doc).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def a_png_1bit(doc):
+    buf = io.BytesIO()
+    a_imagen(doc, '1').save(buf, format='PNG')
+    return buf.getvalue()
+
+
+# ==================== SVG ====================
+# Texto en SVG va sobre la linea base; PIL lo coloca por arriba (ascendente).
+def _svg(elementos):
+    partes = []
+    for el in elementos:
+        if isinstance(el, Texto):
+            x, y = el.xy
+            ascendente = fuente(el.fuente, el.size).getmetrics()[0]
+            peso = ' font-weight="bold"' if el.fuente == 'bold' else ''
+            partes.append(f'<text x="{x}" y="{y + ascendente}" font-size="{el.size}"{peso} '
+                          f'fill="{el.color}">{escape(el.texto)}</text>')
+        elif isinstance(el, Linea):
+            centro = (el.ancho % 2) / 2  # PIL pinta pixeles completos
+            puntos = ' '.join(f"{x + centro:g},{y + centro:g}" for x, y in el.puntos)
+            partes.append(f'<polyline points="{puntos}" fill="none" stroke="{el.color}" stroke-width="{el.ancho}"/>')
+        elif isinstance(el, Rect):
+            (x0, y0), (x1, y1) = el.caja
+            if el.fill:
+                partes.append(f'<rect x="{x0}" y="{y0}" width="{x1 - x0 + 1}" height="{y1 - y0 + 1}" fill="{el.fill}"/>')
+            if el.outline:
+                m = el.ancho / 2  # el borde de PIL queda dentro de la caja
+                partes.append(f'<rect x="{x0 + m:g}" y="{y0 + m:g}" width="{x1 - x0 + 1 - el.ancho:g}" '
+                              f'height="{y1 - y0 + 1 - el.ancho:g}" fill="none" stroke="{el.outline}" '
+                              f'stroke-width="{el.ancho}"/>')
+    return '\n'.join(partes)
+
+
+@lru_cache(maxsize=None)
+def _svg_fija(plantilla):
+    return _svg(PLANTILLAS[plantilla][3])
+
+
+def a_svg(doc):
+    doc = aplanar(doc)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{doc.ancho}" height="{doc.alto}" '
+            f'viewBox="0 0 {doc.ancho} {doc.alto}" font-family="DejaVu Sans, Verdana, sans-serif">\n'
+            f'<rect width="100%" height="100%" fill="#FFFFFF"/>\n'
+            f'{_svg_fija(doc.plantilla)}\n{_svg(doc.elementos)}\n</svg>\n').encode('utf-8')
+
+
+# ==================== ZPL ====================
+# Para impresoras termicas Zebra: la impresora dibuja el texto y las lineas
+# con sus propias fuentes, a su resolucion (ZPL_DPI). Solo blanco y negro.
+def _zpl(elementos, escala):
+    def d(v):
+        return round(v * escala)
+    partes = []
+    for el in elementos:
+        if isinstance(el, Texto):
+            x, y = el.xy
+            # ^FH\ : ^, ~ y \ se mandan en hexadecimal para no romper el comando
+            texto = el.texto.replace('\\', '\\5C').replace('^', '\\5E').replace('~', '\\7E')
+            partes.append(f"^FO{d(x)},{d(y)}^A0N,{d(el.size)},{d(el.size)}^FH\\^FD{texto}^FS")
+        elif isinstance(el, Linea):
+            for (x0, y0), (x1, y1) in zip(el.puntos, el.puntos[1:]):
+                g = max(1, d(el.ancho))
+                if y0 == y1:
+                    partes.append(f"^FO{d(min(x0, x1))},{d(y0) - g // 2}^GB{d(abs(x1 - x0))},{g},{g}^FS")
+                elif x0 == x1:
+                    partes.append(f"^FO{d(x0) - g // 2},{d(min(y0, y1))}^GB{g},{d(abs(y1 - y0))},{g}^FS")
+                else:
+                    sube = (x1 > x0) != (y1 > y0)
+                    partes.append(f"^FO{d(min(x0, x1))},{d(min(y0, y1))}"
+                                  f"^GD{d(abs(x1 - x0))},{d(abs(y1 - y0))},{g},B,{'R' if sube else 'L'}^FS")
+        elif isinstance(el, Rect):
+            (x0, y0), (x1, y1) = el.caja
+            w, h = d(x1 - x0 + 1), d(y1 - y0 + 1)
+            if el.fill and _bitonal(el.fill) == 0:
+                partes.append(f"^FO{d(x0)},{d(y0)}^GB{w},{h},{min(w, h)}^FS")
+            elif el.outline and _bitonal(el.outline) == 0:
+                partes.append(f"^FO{d(x0)},{d(y0)}^GB{w},{h},{max(1, d(el.ancho))}^FS")
+    return '\n'.join(partes)
+
+
+@lru_cache(maxsize=None)
+def _zpl_fija(plantilla, dpi):
+    return _zpl(PLANTILLAS[plantilla][3], dpi / ETIQUETA_DPI)
+
+
+def a_zpl(doc, dpi=None):
+    doc = aplanar(doc)
+    dpi = dpi or ZPL_DPI
+    escala = dpi / ETIQUETA_DPI
+    return (f"^XA^CI28^PW{round(doc.ancho * escala)}^LL{round(doc.alto * escala)}^LH0,0\n"
+            f"{_zpl_fija(doc.plantilla, dpi)}\n{_zpl(doc.elementos, escala)}\n^XZ\n").encode('utf-8')
+
+
+# ==================== PDF VECTORIAL ====================
+# Texto y lineas como operadores PDF: el archivo pesa una fraccion del PNG y se
+# imprime nitido a cualquier escala. Las ordenes van en hoja carta y la tabla
+# se reparte en paginas (encabezado de la plantilla y titulos en cada una); la
+# memoria depende de la pagina, no del largo de la orden. Las fuentes DejaVu se
+# incrustan una vez por archivo, recortadas a WinAnsi (cp1252).
+PDF_CARTA = (612, 792)  # puntos
+PDF_MARGEN = 30  # px libres al pie de cada pagina (ahi va el numero de pagina)
+_WINANSI = range(32, 256)
+
+
+def _pdf_num(v):
+    return f"{v:.2f}".rstrip('0').rstrip('.')
+
+
+def _pdf_color(color, op):
+    r, g, b = ImageColor.getrgb(color)[:3]
+    return f"{_pdf_num(r / 255)} {_pdf_num(g / 255)} {_pdf_num(b / 255)} {op}"
+
+
+def _pdf_texto(texto):
+    data = texto.encode('cp1252', errors='replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)').decode('latin-1')
+
+
+@lru_cache(maxsize=None)
+def _pdf_fuente(estilo):
+    """(datos TrueType recortados, metricas) de una fuente, una vez por proceso;
+    None si no hay fontTools o no se encuentra el archivo"""
+    if ft_subset is None:
+        return None
+    try:
+        font = TTFont(FUENTES[estilo])
+    except Exception:
+        return None
+    opts = ft_subset.Options()
+    opts.drop_tables += ['FFTM']
+    opts.layout_features = []
+    opts.hinting = False
+    opts.notdef_outline = True
+    sub = ft_subset.Subsetter(opts)
+    caracteres = bytes(_WINANSI).decode('cp1252', errors='ignore')
+    sub.populate(unicodes=[ord(c) for c in caracteres])
+    sub.subset(font)
+    buf = io.BytesIO()
+    font.save(buf)
+
+    escala = 1000 / font['head'].unitsPerEm
+    cmap = font.getBestCmap()
+    hmtx = font['hmtx']
+    anchos = []
+    for codigo in _WINANSI:
+        try:
+            glifo = cmap.get(ord(bytes([codigo]).decode('cp1252')))
+        except UnicodeDecodeError:
+            glifo = None
+        anchos.append(round(hmtx[glifo][0] * escala) if glifo else 0)
+    head, hhea = font['head'], font['hhea']
+    metricas = {
+        'nombre': font['name'].getDebugName(6) or os.path.splitext(os.path.basename(FUENTES[estilo]))[0],
+        'anchos': anchos,
+        'bbox': [round(v * escala) for v in (head.xMin, head.yMin, head.xMax, head.yMax)],
+        'ascent': round(hhea.ascent * escala),
+        'descent': round(hhea.descent * escala),
+        'cap': round(getattr(font['OS/2'], 'sCapHeight', 0) * escala) or round(hhea.ascent * escala),
+    }
+    return buf.getvalue(), metricas
+
+
+def _pdf_fuentes(pdf):
+    """Incrusta regular y bold en el PDF; devuelve el diccionario /Font"""
+    refs = []
+    for nombre, estilo, tag in (('F1', 'regular', 'DURTRA'), ('F2', 'bold', 'DURTRB')):
+        datos = _pdf_fuente(estilo)
+        if datos is None:
+            base = 'Helvetica' if estilo == 'regular' else 'Helvetica-Bold'
+            ref = pdf.objeto(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>")
+        else:
+            ttf, m = datos
+            nombre_pdf = f"{tag}+{m['nombre']}"
+            archivo = pdf.stream(f"/Filter /FlateDecode /Length1 {len(ttf)}", zlib.compress(ttf, 9))
+            desc = pdf.objeto(
+                f"<< /Type /FontDescriptor /FontName /{nombre_pdf} /Flags 32 "
+                f"/FontBBox [{' '.join(map(str, m['bbox']))}] /ItalicAngle 0 /Ascent {m['ascent']} "
+                f"/Descent {m['descent']} /CapHeight {m['cap']} /StemV 80 /FontFile2 {archivo} 0 R >>")
+            ref = pdf.objeto(
+                f"<< /Type /Font /Subtype /TrueType /BaseFont /{nombre_pdf} /FirstChar {_WINANSI[0]} "
+                f"/LastChar {_WINANSI[-1]} /Widths [{' '.join(map(str, m['anchos']))}] "
+                f"/FontDescriptor {desc} 0 R /Encoding /WinAnsiEncoding >>")
+        refs.append(f"/{nombre} {ref} 0 R")
+    return f"<< /Font << {' '.join(refs)} >> >>"
+
+
+def _pdf_ops(elementos):
+    """Operadores PDF en coordenadas de pixel (y hacia abajo, ver _pdf_pagina)"""
+    ops = []
+    for el in elementos:
+        if isinstance(el, Texto):
+            x, y = el.xy
+            ascendente = fuente(el.fuente, el.size).getmetrics()[0]
+            f = 'F2' if el.fuente == 'bold' else 'F1'
+            ops.append(f"BT /{f} {el.size} Tf {_pdf_color(el.color, 'rg')} "
+                       f"1 0 0 -1 {_pdf_num(x)} {_pdf_num(y + ascendente)} Tm ({_pdf_texto(el.texto)}) Tj ET")
+        elif isinstance(el, Linea):
+            centro = (el.ancho % 2) / 2  # igual que en SVG: PIL pinta pixeles completos
+            (x0, y0), *resto = el.puntos
+            trazo = ' '.join(f"{_pdf_num(x + centro)} {_pdf_num(y + centro)} l" for x, y in resto)
+            ops.append(f"{_pdf_color(el.color, 'RG')} {el.ancho} w "
+                       f"{_pdf_num(x0 + centro)} {_pdf_num(y0 + centro)} m {trazo} S")
+        elif isinstance(el, Rect):
+            (x0, y0), (x1, y1) = el.caja
+            if el.fill:
+                ops.append(f"{_pdf_color(el.fill, 'rg')} {x0} {y0} {x1 - x0 + 1} {y1 - y0 + 1} re f")
+            if el.outline:
+                m = el.ancho / 2
+                ops.append(f"{_pdf_color(el.outline, 'RG')} {el.ancho} w {_pdf_num(x0 + m)} {_pdf_num(y0 + m)} "
+                           f"{_pdf_num(x1 - x0 + 1 - el.ancho)} {_pdf_num(y1 - y0 + 1 - el.ancho)} re S")
+    return '\n'.join(ops)
+
+
+@lru_cache(maxsize=None)
+def _pdf_fija(plantilla):
+    return _pdf_ops(PLANTILLAS[plantilla][3])
+
+
+def _pdf_pagina(pdf, recursos, plantilla, escala, ancho_pt, alto_pt, elementos):
+    contenido = (f"q {_pdf_num(escala)} 0 0 {_pdf_num(-escala)} 0 {_pdf_num(alto_pt)} cm\n"
+                 f"{_pdf_fija(plantilla)}\n{_pdf_ops(elementos)}\nQ")
+    pdf.pagina(ancho_pt, alto_pt, contenido.encode('latin-1'), recursos)
+
+
+def _alto_elementos(elementos):
+    """Borde inferior (px) del grupo de elementos"""
+    alto = 0
+    for el in elementos:
+        if isinstance(el, Texto):
+            alto = max(alto, el.xy[1] + sum(fuente(el.fuente, el.size).getmetrics()))
+        elif isinstance(el, Linea):
+            alto = max(alto, max(y for _, y in el.puntos) + el.ancho)
+        elif isinstance(el, Rect):
+            alto = max(alto, el.caja[1][1] + 1)
+    return alto
+
+
+def paginar(doc, alto_pagina):
+    """Reparte las filas de un Paginado en paginas de alto_pagina px:
+    listas de elementos en coordenadas de cada pagina"""
+    alto_fija = PLANTILLAS[doc.plantilla][2]
+    limite = alto_pagina - PDF_MARGEN
+    # Lo variable que cae dentro de la banda fija (folio, fecha) se repite en cada pagina
+    banda = [el for el in doc.encabezado if _alto_elementos([el]) <= alto_fija]
+    paginas = [list(doc.encabezado) + mover(doc.titulos, doc.y_tabla)]
+    y = doc.y_tabla + doc.titulos_alto
+
+    def nueva(con_titulos=True):
+        paginas.append(list(banda))
+        y = alto_fija + 15
+        if con_titulos:
+            paginas[-1] += mover(doc.titulos, y)
+            y += doc.titulos_alto
+        return y
+
+    for fila in doc.filas:
+        if y + doc.fila_alto > limite:
+            y = nueva()
+        paginas[-1] += mover(fila, y)
+        y += doc.fila_alto
+    if y + _alto_elementos(doc.cierre) > limite:
+        y = nueva(con_titulos=False)
+    paginas[-1] += mover(doc.cierre, y)
+    return paginas
+
+
+def a_pdf(doc):
+    """PDF vectorial: ordenes (Paginado) en hoja carta paginadas; el resto en
+    una pagina del tamano del documento a ETIQUETA_DPI"""
+    pdf = Pdf()
+    recursos = _pdf_fuentes(pdf)
+    if not isinstance(doc, Paginado):
+        escala = 72 / ETIQUETA_DPI
+        _pdf_pagina(pdf, recursos, doc.plantilla, escala, doc.ancho * escala, doc.alto * escala, doc.elementos)
+        return pdf.salida()
+
+    ancho_pt, alto_pt = PDF_CARTA
+    escala = ancho_pt / doc.ancho
+    alto_pagina = alto_pt / escala
+    paginas = paginar(doc, alto_pagina)
+    for i, elementos in enumerate(paginas, 1):
+        numero = f"Pagina {i} de {len(paginas)}"
+        x = doc.ancho - 20 - fuente('regular', 10).getlength(numero)
+        elementos.append(Texto((round(x), round(alto_pagina) - 22), numero, '#999999', 'regular', 10))
+        _pdf_pagina(pdf, recursos, doc.plantilla, escala, ancho_pt, alto_pt, elementos)
+    return pdf.salida()
+
+
+# formato -> generador (los bytes que se guardan en la cache)
+FORMATOS = {
+    'png': a_png,
+    'png1': a_png_1bit,
+    'svg': a_svg,
+    'zpl': a_zpl,
+    'pdf': a_pdf,
+}
+MIMETYPES = {'png': 'image/png', 'png1': 'image/png', 'svg': 'image/svg+xml', 'zpl': 'text/plain',
+             'pdf': 'application/pdf'}
+EXTENSIONES = {'png': 'png', 'png1': 'png', 'svg': 'svg', 'zpl': 'zpl', 'pdf': 'pdf'}
+
+
+# ==================== CACHE EN DISCO ====================
+# Un archivo por documento en RENDER_CACHE_DIR/<2 hex>/<clave>.<formato>.
+# Escritura atomica (archivo temporal + os.replace), asi otro worker nunca lee
+# un archivo a medias. El mtime marca el ultimo uso; al pasar del tope se
+# borran los menos usados (LRU).
+_escrito = 0  # bytes escritos por este proceso desde la ultima poda
+_escrito_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _hash_plantilla(plantilla):
+    return hashlib.sha256(repr(PLANTILLAS[plantilla]).encode('utf-8')).hexdigest()
+
+
+def clave(doc, formato='png'):
+    """Hash del contenido del documento; sirve tambien como ETag fuerte"""
+    h = hashlib.sha256()
+    h.update(f"{RENDER_VERSION}:{formato}:{_hash_plantilla(doc.plantilla)}:".encode('utf-8'))
+    h.update(repr(doc).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _ruta(k, formato):
+    return os.path.join(RENDER_CACHE_DIR, k[:2], f"{k}.{formato}")
+
+
+def leer_cache(k, formato):
+    ruta = _ruta(k, formato)
+    try:
+        with open(ruta, 'rb') as f:
+            data = f.read()
+        os.utime(ruta)
+    except OSError:
+        return None
+    return data
+
+
+def guardar_cache(k, formato, data):
+    global _escrito
+    ruta = _ruta(k, formato)
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, ruta)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar {ruta} en la cache de render: {e}")
+        if tmp:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return
+    with _escrito_lock:
+        _escrito += len(data)
+        podar = _escrito >= RENDER_CACHE_MAX_BYTES // 10
+        if podar:
+            _escrito = 0
+    if podar:
+        podar_cache()
+
+
+def podar_cache(max_bytes=None):
+    """Borra los archivos menos usados hasta dejar la cache en 90% del tope"""
+    max_bytes = RENDER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        lock = open(os.path.join(RENDER_CACHE_DIR, '.poda.lock'), 'w')
+    except OSError:
+        return 0
+    with lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return 0  # otro worker ya esta podando
+        archivos = []
+        total = 0
+        viejo = time.time() - 3600
+        for sub in os.scandir(RENDER_CACHE_DIR):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.startswith('.tmp-'):
+                    if st.st_mtime < viejo:  # temporal de un proceso que murio
+                        _borrar(entry.path)
+                    continue
+                archivos.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        borrados = 0
+        if total > max_bytes:
+            objetivo = max_bytes * 9 // 10
+            for _, size, path in sorted(archivos):
+                if total <= objetivo:
+                    break
+                if _borrar(path):
+                    total -= size
+                    borrados += 1
+        return borrados
+
+
+def _borrar(path):
+    try:
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
+
+
+def _leer(k, formato):
+    return leer_cache(k, formato) if RENDER_CACHE_MAX_BYTES else None
+
+
+def _render_y_guardar(doc, formato):
+    """Corre en el pool: genera el archivo y lo deja en la cache compartida"""
+    data = FORMATOS[formato](doc)
+    if RENDER_CACHE_MAX_BYTES:
+        guardar_cache(clave(doc, formato), formato, data)
+    return data
+
+
+def _render_varios(docs, formato):
+    return [_render_y_guardar(doc, formato) for doc in docs]
+
+
+def cacheado(doc, formato='png'):
+    """(clave, bytes) del documento en el formato pedido: de la cache si ya
+    existe, si no se genera en el pool (puede lanzar RenderSaturado)"""
+    k = clave(doc, formato)
+    data = _leer(k, formato)
+    if data is not None:
+        _contar('cache')
+        return k, data
+    if not _reservar(1):
+        raise RenderSaturado('Generador de documentos ocupado, intente de nuevo', RENDER_RETRY_AFTER)
+    return k, _esperar([_enviar(_render_y_guardar, doc, formato)], RENDER_TIMEOUT)[0]
+
+
+def generar_lote(docs, formato='png'):
+    """bytes de cada documento, en el mismo orden. Lo que no esta en cache se
+    reparte en grupos entre los procesos del pool (puede lanzar RenderSaturado)."""
+    resultado = [None] * len(docs)
+    faltan = []
+    for i, doc in enumerate(docs):
+        data = _leer(clave(doc, formato), formato)
+        if data is None:
+            faltan.append(i)
+        else:
+            resultado[i] = data
+    _contar('cache', len(docs) - len(faltan))
+    if not faltan:
+        return resultado
+    n = _reservar(min(len(faltan), RENDER_WORKERS * 2))
+    if not n:
+        raise RenderSaturado('Generador de documentos ocupado, intente de nuevo', RENDER_RETRY_AFTER)
+    grupos = [faltan[i::n] for i in range(n)]
+    futuros = []
+    try:
+        for g in grupos:
+            futuros.append(_enviar(_render_varios, [docs[i] for i in g], formato))
+    except Exception:
+        for _ in range(len(grupos) - len(futuros) - 1):  # _enviar ya libero el suyo
+            _liberar()
+        raise
+    for g, datos in zip(grupos, _esperar(futuros, RENDER_LOTE_TIMEOUT)):
+        for i, data in zip(g, datos):
+            resultado[i] = data
+    return resultado
+
+
+# ==================== POOL DE RENDER ====================
+# Cada worker web tiene su pool de RENDER_WORKERS procesos. Los trabajos en
+# curso o en cola se limitan a RENDER_QUEUE_MAX: si no hay lugar se responde
+# 503 con Retry-After en vez de encolar sin limite. Si un trabajo pasa de su
+# timeout se responde 503, pero el trabajo termina y deja el archivo en la
+# cache, asi el reintento lo encuentra listo.
+RENDER_TIMEOUT = float(os.environ.get('RENDER_TIMEOUT', 15))             # por documento
+RENDER_LOTE_TIMEOUT = float(os.environ.get('RENDER_LOTE_TIMEOUT', 90))   # por lote (menor al --timeout de gunicorn)
+RENDER_QUEUE_MAX = int(os.environ.get('RENDER_QUEUE_MAX', 0)) or RENDER_WORKERS * 4
+RENDER_RETRY_AFTER = 2   # segundos, cola llena
+RENDER_RETRY_TIMEOUT = 5  # segundos, el documento sigue generandose
+# En el mismo proceso, sin pool (benchmark_render.py, depuracion); la cola se sigue contando igual
+RENDER_INLINE = os.environ.get('RENDER_INLINE') == '1'
+
+
+class RenderSaturado(Exception):
+    def __init__(self, mensaje, retry_after):
+        super().__init__(mensaje)
+        self.retry_after = retry_after
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_en_curso = 0
+_stats = {'trabajos': 0, 'cache': 0, 'rechazados': 0, 'timeouts': 0}
+
+
+def _iniciar_worker():
+    try:
+        os.nice(RENDER_NICE)
+    except OSError:
+        pass
+
+
+def pool():
+    """Pool de procesos de este worker web, creado al primer uso.
+    forkserver: los hijos no heredan conexiones ni hilos del proceso web."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                ctx = multiprocessing.get_context('forkserver')
+                ctx.set_forkserver_preload(['render'])
+                _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=ctx,
+                                            initializer=_iniciar_worker)
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _descartar_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None  # un hijo murio: el siguiente trabajo crea otro pool
+
+
+def _contar(nombre, n=1):
+    with _pool_lock:
+        _stats[nombre] += n
+
+
+def _reservar(n):
+    """Aparta hasta n lugares de la cola; devuelve cuantos (0 si esta llena)"""
+    global _en_curso
+    with _pool_lock:
+        n = max(0, min(n, RENDER_QUEUE_MAX - _en_curso))
+        _en_curso += n
+        if not n:
+            _stats['rechazados'] += 1
+        return n
+
+
+def _liberar(_futuro=None):
+    global _en_curso
+    with _pool_lock:
+        _en_curso -= 1
+
+
+def _enviar(fn, *args):
+    """Manda un trabajo (con su lugar ya reservado) al pool"""
+    if RENDER_INLINE:
+        futuro = Future()
+        try:
+            futuro.set_result(fn(*args))
+        except Exception as e:
+            futuro.set_exception(e)
+        _contar('trabajos')
+        futuro.add_done_callback(_liberar)
+        return futuro
+    try:
+        futuro = pool().submit(fn, *args)
+    except BrokenProcessPool:
+        _liberar()
+        _descartar_pool()
+        raise
+    except Exception:
+        _liberar()
+        raise
+    _contar('trabajos')
+    futuro.add_done_callback(_liberar)  # el lugar se libera cuando el trabajo termina de verdad
+    return futuro
+
+
+def _esperar(futuros, timeout):
+    fin = time.monotonic() + timeout
+    resultados = []
+    for futuro in futuros:
+        try:
+            resultados.append(futuro.result(timeout=max(0, fin - time.monotonic())))
+        except FuturesTimeout:
+            _contar('timeouts')
+            raise RenderSaturado('El documento se sigue generando, intente de nuevo', RENDER_RETRY_TIMEOUT)
+        except BrokenProcessPool:
+            _descartar_pool()
+            raise
+    return resultados
+
+
+def pool_stats():
+    with _pool_lock:
+        s = dict(_stats)
+        s.update({'workers': RENDER_WORKERS, 'cola_max': RENDER_QUEUE_MAX, 'en_curso': _en_curso})
+    return s
+
+
+def zip_archivos(archivos):
+    """ZIP sin recomprimir (los PNG ya vienen comprimidos); archivos: [(nombre, bytes)]"""
+    buf = io.BytesIO()
+    usados = set()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as z:
+        for nombre, data in archivos:
+            base, ext = os.path.splitext(nombre)
+            n = 1
+            while nombre in usados:
+                n += 1
+                nombre = f"{base}_{n}{ext}"
+            usados.add(nombre)
+            z.writestr(nombre, data)
+    return buf.getvalue()
+
+
+# ==================== PDF ====================
+class Pdf:
+    """Escritor PDF minimo: objetos numerados, paginas, xref y trailer"""
+
+    def __init__(self):
+        self._objetos = [b'', b'']  # 1: catalogo, 2: arbol de paginas (se llenan al final)
+        self._paginas = []
+
+    def objeto(self, cuerpo):
+        self._objetos.append(cuerpo if isinstance(cuerpo, bytes) else cuerpo.encode('latin-1'))
+        return len(self._objetos)
+
+    def stream(self, dic, data):
+        return self.objeto(f"<< {dic} /Length {len(data)} >>\nstream\n".encode('latin-1') + data + b"\nendstream")
+
+    def pagina(self, ancho, alto, contenido, recursos):
+        """ancho/alto en puntos; contenido: operadores PDF de la pagina"""
+        cont = self.stream('/Filter /FlateDecode', zlib.compress(contenido))
+        self._paginas.append(self.objeto(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {ancho:.2f} {alto:.2f}] "
+            f"/Resources {recursos} /Contents {cont} 0 R >>"))
+
+    def salida(self):
+        self._objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+        kids = ' '.join(f"{n} 0 R" for n in self._paginas)
+        self._objetos[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(self._paginas)} >>".encode('latin-1')
+        out = io.BytesIO()
+        out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for i, cuerpo in enumerate(self._objetos, 1):
+            offsets.append(out.tell())
+            out.write(b"%d 0 obj\n" % i + cuerpo + b"\nendobj\n")
+        xref = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        for off in offsets:
+            out.write(b"%010d 00000 n \n" % off)
+        out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+        return out.getvalue()
+
+
+def _png_datos(png):
+    """(ancho, alto, colores, bits, IDAT) de un PNG gris o RGB sin entrelazar"""
+    if png[:8] != b'\x89PNG\r\n\x1a\n':
+        raise ValueError('No es un PNG')
+    pos = 8
+    idat = []
+    ihdr = None
+    while pos < len(png):
+        largo, tipo = struct.unpack('>I4s', png[pos:pos + 8])
+        datos = png[pos + 8:pos + 8 + largo]
+        if tipo == b'IHDR':
+            ihdr = struct.unpack('>IIBBBBB', datos)
+        elif tipo == b'IDAT':
+            idat.append(datos)
+        elif tipo == b'IEND':
+            break
+        pos += 12 + largo
+    ancho, alto, bits, color, _, _, entrelazado = ihdr
+    if color not in (0, 2) or entrelazado:
+        return None
+    return ancho, alto, 1 if color == 0 else 3, bits, b''.join(idat)
+
+
+def pdf_imagenes(pngs, dpi=ETIQUETA_DPI):
+    """PDF con un PNG por pagina, del tamano de la imagen a dpi. Los datos
+    comprimidos del PNG se incrustan tal cual (FlateDecode + predictor PNG)."""
+    pdf = Pdf()
+    for png in pngs:
+        datos = _png_datos(png)
+        if datos is None:  # paleta/alfa/entrelazado: se normaliza a RGB
+            buf = io.BytesIO()
+            Image.open(io.BytesIO(png)).convert('RGB').save(buf, format='PNG')
+            datos = _png_datos(buf.getvalue())
+        ancho, alto, colores, bits, idat = datos
+        espacio = '/DeviceGray' if colores == 1 else '/DeviceRGB'
+        img = pdf.stream(
+            f"/Type /XObject /Subtype /Image /Width {ancho} /Height {alto} /ColorSpace {espacio} "
+            f"/BitsPerComponent {bits} /Filter /FlateDecode "
+            f"/DecodeParms << /Predictor 15 /Colors {colores} /BitsPerComponent {bits} /Columns {ancho} >>",
+            idat)
+        w, h = ancho * 72 / dpi, alto * 72 / dpi
+        pdf.pagina(w, h, f"q {w:.2f} 0 0 {h:.2f} 0 0 cm /Im0 Do Q".encode('latin-1'),
+                   f"<< /XObject << /Im0 {img} 0 R >> >>")
+    return pdf.salida()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Verificacion del transporte de Resend y de la cola de correos (correo.py)
+
+Levanta un servidor HTTP local que imita el API de Resend (/emails y
+/emails/batch, con keep-alive) y comprueba contra el:
+
+- transporte: un lote = una peticion, reutilizacion de conexiones keep-alive,
+  recuperacion cuando el servidor cerro una conexion ociosa, 429 con
+  Retry-After y los contadores de envios, fallos y latencia
+- cola (si hay base): correos sin adjuntos en una sola peticion, pausa por 429
+  sin gastar intentos, el reintento de un lote con la misma Idempotency-Key
+  y un lote rechazado (422) que se manda uno por uno
+
+La parte de cola crea un esquema temporal, aplica las migraciones y lo borra
+al terminar. Sin CORREO_DATABASE_URL solo se verifica el transporte.
+
+Uso:
+    CORREO_DATABASE_URL=postgresql://postgres@localhost/durtron_test python verificar_correo.py
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCHEMA = 'verificar_correo'
+API_KEY = 're_prueba'
+
+
+class ResendFalso(ThreadingHTTPServer):
+    """Registra cada peticion (ruta, Idempotency-Key, cuerpo, puerto del
+    cliente) y responde lo que haya en self.respuestas o, si esta vacia, un
+    envio exitoso. Un correo a una direccion con 'invalido' recibe 422, y si
+    va en un lote, el lote entero tambien (como Resend)."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Manejador)
+        self.peticiones = []
+        self.respuestas = []   # (status, headers) para las siguientes peticiones
+        self.cerrar_tras = 0   # cuantas respuestas cierran la conexion sin avisar
+        self._lock = threading.Lock()
+        self._n = 0
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def rutas(self, desde=0):
+        return [p['ruta'] for p in self.peticiones[desde:]]
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        srv = self.server
+        cuerpo = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with srv._lock:
+            srv.peticiones.append({'ruta': self.path, 'clave': self.headers.get('Idempotency-Key'),
+                                   'cuerpo': cuerpo, 'puerto': self.client_address[1],
+                                   'auth': self.headers.get('Authorization')})
+            guion = srv.respuestas.pop(0) if srv.respuestas else None
+            cerrar = srv.cerrar_tras > 0
+            srv.cerrar_tras -= cerrar
+            correos = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+            ids = []
+            for _ in correos:
+                srv._n += 1
+                ids.append(f'mock-{srv._n}')
+        if guion is not None:
+            status, headers = guion
+            data = {'message': 'respuesta de prueba'}
+        elif any('invalido' in c['to'][0] for c in correos):
+            status, headers = 422, {}
+            data = {'message': 'Invalid `to` field'}
+        else:
+            status, headers = 200, {}
+            data = {'data': [{'id': i} for i in ids]} if isinstance(cuerpo, list) else {'id': ids[0]}
+        salida = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(salida)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(salida)
+        # Sin 'Connection: close': el cliente cree que sigue abierta, como
+        # cuando el servidor cierra una conexion keep-alive ociosa
+        self.close_connection = cerrar
+
+
+fallas = []
+
+
+def verificar(condicion, texto):
+    print(f"{'OK   ' if condicion else 'FALLA'} {texto}")
+    if not condicion:
+        fallas.append(texto)
+
+
+def correo_prueba(i, destinatario=None, adjuntos=()):
+    return {'id': i, 'destinatario': destinatario or f'prov{i}@example.com', 'asunto': f'Prueba {i}',
+            'texto': 'Texto de prueba', 'adjuntos': list(adjuntos)}
+
+
+def verificar_transporte(correo, srv):
+    t = correo.TransporteResend(api_key=API_KEY, url=srv.url, conexiones=2, timeout=5)
+
+    lote = [correo_prueba(i) for i in range(1, 6)]
+    ids = t.enviar_lote(lote)
+    p = srv.peticiones[-1]
+    verificar(srv.rutas() == ['/emails/batch'] and len(p['cuerpo']) == 5,
+              'un lote de 5 correos sin adjuntos es una sola peticion a /emails/batch')
+    verificar(ids == ['mock-1', 'mock-2', 'mock-3', 'mock-4', 'mock-5'], 'el lote devuelve un id por correo')
+    verificar(p['clave'] == correo.clave_lote(lote) and p['auth'] == f'Bearer {API_KEY}',
+              'el lote lleva Idempotency-Key y la llave del API')
+
+    desde = len(srv.peticiones)
+    for i in range(6, 11):
+        t.enviar(correo_prueba(i, adjuntos=[{'filename': 'orden.pdf', 'content': 'JVBERi0='}]))
+    nuevas = srv.peticiones[desde:]
+    conexiones = t.stats()['conexiones']
+    verificar(len({p['puerto'] for p in srv.peticiones}) == 1 and conexiones == {'nuevas': 1, 'reusadas': 5},
+              f'6 peticiones seguidas usan una sola conexion keep-alive ({conexiones})')
+    verificar(all(p['clave'] == f"durtron-email-{p['cuerpo']['subject'].split()[-1]}" for p in nuevas),
+              'cada envio individual lleva su propia Idempotency-Key')
+
+    srv.cerrar_tras = 1
+    t.enviar(correo_prueba(11))
+    puerto = srv.peticiones[-1]['puerto']
+    t.enviar(correo_prueba(12))
+    conexiones = t.stats()['conexiones']
+    verificar(srv.peticiones[-1]['puerto'] != puerto and conexiones['nuevas'] == 2,
+              f'una conexion que el servidor cerro se reabre y el envio sale ({conexiones})')
+
+    srv.respuestas.append((429, {'Retry-After': '3'}))
+    try:
+        correo._enviar_grupo(t, [correo_prueba(13)])
+        verificar(False, '429 lanza ErrorEnvio')
+    except correo.ErrorEnvio as e:
+        pausa = correo._pausa_hasta - time.monotonic()
+        verificar(e.retry_after == 3 and 2 < pausa <= 3,
+                  f'429 con Retry-After: 3 pausa los envios del proceso ({pausa:.1f}s)')
+    correo._pausa_hasta = 0.0
+
+    srv.respuestas.append((500, {}))
+    try:
+        t.enviar(correo_prueba(14))
+    except correo.ErrorEnvio as e:
+        verificar(e.reintentar, '500 es un error temporal (se reintenta)')
+    try:
+        t.enviar(correo_prueba(15, 'invalido@example'))
+    except correo.ErrorEnvio as e:
+        verificar(not e.reintentar, '422 es un error definitivo')
+
+    s = t.stats()
+    verificar(s['peticiones'] == 11 and s['lotes'] == 1 and s['enviados'] == 12 and s['fallos'] == 3,
+              f"contadores: {s['peticiones']} peticiones, {s['lotes']} lote, {s['enviados']} enviados, "
+              f"{s['fallos']} fallos")
+    verificar(0 < s['latencia_ms_prom'] <= s['latencia_ms_max'],
+              f"latencia promedio {s['latencia_ms_prom']} ms, maxima {s['latencia_ms_max']} ms")
+    t.http.cerrar()
+    t.ejecutor.shutdown()
+
+
+def verificar_cola(correo, srv, conn):
+    import psycopg2.extras
+
+    t = correo.TransporteResend(api_key=API_KEY, url=srv.url, conexiones=2, timeout=5)
+    correo.usar_transporte(t)
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+    def encolar(destinatarios, adjunto=False):
+        ids = [correo.encolar(cur, 'prueba', d, f'Prueba {d}', 'Texto',
+                              [('orden.pdf', b'%PDF-1.4')] if adjunto else ())
+               for d in destinatarios]
+        conn.commit()
+        return ids
+
+    def filas(ids):
+        cur.execute('SELECT * FROM email_outbox WHERE id = ANY(%s) ORDER BY id', (ids,))
+        r = cur.fetchall()
+        conn.commit()
+        return r
+
+    def vencer(ids):
+        cur.execute('UPDATE email_outbox SET proximo_intento = CURRENT_TIMESTAMP WHERE id = ANY(%s)', (ids,))
+        conn.commit()
+
+    # Correos sin adjuntos en un lote, el que lleva adjunto aparte
+    ids = encolar([f'cola{i}@example.com' for i in range(5)])
+    ids += encolar(['conadjunto@example.com'], adjunto=True)
+    desde = len(srv.peticiones)
+    correo.procesar()
+    verificar(sorted(srv.rutas(desde)) == ['/emails', '/emails/batch'],
+              f'cola: 5 correos sin adjuntos y 1 con adjunto salen en 2 peticiones ({srv.rutas(desde)})')
+    r = filas(ids)
+    verificar(all(f['estado'] == 'enviado' and f['proveedor_id'] for f in r),
+              'cola: los 6 quedan enviados con el id del proveedor')
+
+    # 429: se pospone sin gastar intento y el proceso se pausa
+    ids = encolar([f'pausa{i}@example.com' for i in range(3)])
+    srv.respuestas.append((429, {'Retry-After': '2'}))
+    desde = len(srv.peticiones)
+    correo.procesar()
+    r = filas(ids)
+    verificar(all(f['estado'] == 'pendiente' and f['intentos'] == 0 for f in r),
+              'cola: con 429 el lote vuelve a pendiente sin gastar intento')
+    verificar(correo.procesar() == 0 and len(srv.peticiones) == desde + 1,
+              'cola: durante la pausa no se hacen peticiones')
+    clave = srv.peticiones[-1]['clave']
+
+    # Reintento tras la pausa (y tras un 503): mismo lote, misma llave
+    correo._pausa_hasta = 0.0
+    vencer(ids)
+    srv.respuestas.append((503, {}))
+    correo.procesar()
+    vencer(ids)
+    correo.procesar()
+    claves = [p['clave'] for p in srv.peticiones[desde:]]
+    verificar(len(claves) == 3 and set(claves) == {clave},
+              'cola: el lote se reintenta completo con la misma Idempotency-Key')
+    verificar(all(f['estado'] == 'enviado' and f['intentos'] == 2 for f in filas(ids)),
+              'cola: tras el 503 el lote sale (el 429 no conto como intento)')
+
+    # 422 por un destinatario invalido: los demas salen, solo ese queda en error
+    ids = encolar(['bien1@example.com', 'bien2@example.com', 'invalido@example', 'bien3@example.com'])
+    desde = len(srv.peticiones)
+    correo.procesar()
+    r = filas(ids)
+    verificar(all(f['estado'] == 'pendiente' and f['individual'] and f['intentos'] == 0 for f in r),
+              'cola: un lote rechazado con 422 vuelve a la cola como envios individuales')
+    correo.procesar()
+    r = {f['destinatario']: f['estado'] for f in filas(ids)}
+    verificar(srv.rutas(desde) == ['/emails/batch'] + ['/emails'] * 4,
+              'cola: despues del 422 se manda cada correo por separado')
+    verificar(r == {'bien1@example.com': 'enviado', 'bien2@example.com': 'enviado',
+                    'invalido@example': 'error', 'bien3@example.com': 'enviado'},
+              'cola: solo el destinatario invalido queda en error')
+    t.ejecutor.shutdown()
+
+
+if __name__ == '__main__':
+    url = os.environ.get('CORREO_DATABASE_URL', '').replace('postgres://', 'postgresql://', 1)
+    srv = ResendFalso()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    os.environ.update({'EMAIL_WORKER': '0', 'EMAIL_POR_SEGUNDO': '1000', 'EMAIL_TRANSPORTE': 'resend',
+                       'RESEND_API_KEY': API_KEY, 'RESEND_API_URL': srv.url})
+    if url:
+        os.environ['DATABASE_URL'] = url
+        # Solo el esquema temporal: las migraciones crean ahi sus tablas
+        os.environ['PGOPTIONS'] = f'-c search_path={SCHEMA}'
+    import correo
+
+    verificar_transporte(correo, srv)
+    if url:
+        import psycopg2
+        import migrate
+
+        admin = psycopg2.connect(url)
+        admin.autocommit = True
+        admin.cursor().execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}')
+        try:
+            migrate.migrate(verbose=False)
+            conn = psycopg2.connect(url)
+            verificar_cola(correo, srv, conn)
+            conn.close()
+        finally:
+            admin.cursor().execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+            admin.close()
+    else:
+        print('Sin CORREO_DATABASE_URL: no se verifico la cola')
+    srv.shutdown()
+
+    if fallas:
+        print(f'\n{len(fallas)} verificaciones fallaron')
+        sys.exit(1)
+    print('\nTodo en orden')
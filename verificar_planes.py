@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Verificacion de planes de ejecucion de las consultas frecuentes de app.py
+
+Crea un esquema temporal en una base PostgreSQL local, importa app.py (que
+aplica ahi las migraciones), lo llena con datos a escala (decenas de miles de
+ventas e inventario) y pide cada ruta caliente por el cliente de pruebas de
+Flask. El SQL que la ruta ejecuta se captura en el cursor y se le hace
+EXPLAIN: si la ruta cambia su consulta, se verifica la consulta nueva. Falla
+si alguna recae en un Seq Scan sobre una tabla grande, o si la ruta ya no
+ejecuta la consulta esperada. El esquema se borra al final.
+
+Uso:
+    PLANES_DATABASE_URL=postgresql://postgres@localhost/durtron_test python verificar_planes.py [--escala 1.0]
+"""
+
+import json
+import os
+import sys
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+SCHEMA = 'plan_check'
+
+# Volumen base de cada tabla (se multiplica por --escala)
+VOLUMEN = {
+    'equipos': 300,
+    'proveedores': 3000,
+    'inventario': 60000,      # ~90% vendida, como un historial de varios anios
+    'cotizaciones': 15000,
+    'requisiciones': 6000,
+}
+
+SEED_SQL = '''
+INSERT INTO equipos (codigo, nombre, marca, modelo, categoria, precio_lista, precio_costo, especificaciones)
+SELECT 'EQ-' || g, 'Equipo ' || g, 'DURTRON', 'MOD-' || g, 'Categoria ' || (g %% 15),
+       100000 + g, 60000 + g, repeat('especificacion ', 20)
+FROM generate_series(1, %(equipos)s) g;
+
+INSERT INTO proveedores (razon_social, contacto_nombre, correo, whatsapp)
+SELECT 'Proveedor ' || g, 'Contacto ' || g, 'prov' || g || '@example.com', '618' || g
+FROM generate_series(1, %(proveedores)s) g;
+
+INSERT INTO inventario (equipo_id, numero_serie, estado, fecha_ingreso, fecha_creacion)
+SELECT 1 + g %% %(equipos)s, 'SER-' || g,
+       CASE WHEN g %% 10 = 0 THEN 'Disponible' WHEN g %% 10 = 1 THEN 'En Fabricacion' ELSE 'Vendida' END,
+       DATE '2016-01-01' + (g %% 5400), TIMESTAMP '2016-01-01' + (g || ' hours')::interval
+FROM generate_series(1, %(inventario)s) g;
+
+INSERT INTO ventas (inventario_id, equipo_id, vendedor, cliente_nombre, cliente_rfc, precio_venta,
+                    facturado, fecha_venta)
+SELECT id, equipo_id, 'Vendedor ' || (id %% 8), 'Cliente ' || id, 'RFC' || id, 100000 + id %% 5000,
+       id %% 2 = 0, fecha_ingreso
+FROM inventario WHERE estado = 'Vendida';
+
+INSERT INTO anticipos (venta_id, monto, fecha, notas)
+SELECT v.id, 10000, v.fecha_venta + n, 'Anticipo ' || n
+FROM ventas v, generate_series(0, 1) n;
+
+INSERT INTO cotizaciones (folio, cliente_nombre, cliente_empresa, vendedor, subtotal, total, fecha_creacion)
+SELECT 'COT-' || g, 'Cliente ' || g, 'Empresa ' || g, 'Vendedor ' || (g %% 8), 1000, 1160,
+       TIMESTAMP '2016-01-01' + (g * 7 || ' hours')::interval
+FROM generate_series(1, %(cotizaciones)s) g;
+
+INSERT INTO cotizacion_items (cotizacion_id, equipo_id, descripcion, cantidad, precio_unitario, total_linea)
+SELECT c.id, 1 + (c.id + n) %% %(equipos)s, 'Partida ' || n, 1, 250, 250
+FROM cotizaciones c, generate_series(1, 4) n;
+
+INSERT INTO requisiciones (folio, proveedor_id, equipo_nombre, notas, fecha_creacion)
+SELECT 'REQ-' || g, 1 + g %% %(proveedores)s, 'Equipo ' || g, 'Notas ' || g,
+       TIMESTAMP '2016-01-01' + (g * 19 || ' hours')::interval
+FROM generate_series(1, %(requisiciones)s) g;
+
+INSERT INTO requisicion_items (requisicion_id, componente, proveedor_nombre, cantidad, precio_unitario)
+SELECT r.id, 'Componente ' || n, 'Proveedor ' || (1 + (r.id + n %% 3) %% %(proveedores)s), n, 100
+FROM requisiciones r, generate_series(1, 10) n;
+
+INSERT INTO requisicion_envios (requisicion_id, proveedor_nombre, estado)
+SELECT r.id, 'Proveedor ' || (1 + (r.id + n) %% %(proveedores)s), 'Pendiente'
+FROM requisiciones r, generate_series(0, 1) n;
+
+INSERT INTO equipo_partes (equipo_id, nombre_parte, cantidad, proveedor_id)
+SELECT e.id, 'Parte ' || n, 1, 1 + (e.id * 7 + n) %% %(proveedores)s
+FROM equipos e, generate_series(1, 60) n;
+'''
+
+TABLAS = ['equipos', 'proveedores', 'inventario', 'ventas', 'anticipos', 'cotizaciones',
+          'cotizacion_items', 'requisiciones', 'requisicion_items', 'requisicion_envios',
+          'equipo_partes']
+
+# (nombre, metodo, url, json, texto que identifica la consulta entre las que
+#  ejecuta la ruta, tablas donde un Seq Scan es regresion). Los ids salen de
+# la siembra: la venta/unidad 4242 existe (vendida), la requisicion 321 tiene
+# partidas de 'Proveedor 323' y el equipo 42 partes del proveedor 300.
+CONSULTAS = [
+    ('ventas por unidad de inventario', 'DELETE', '/api/inventario/4242', None,
+     'FROM ventas WHERE inventario_id', ['ventas']),
+    ('suma de anticipos de una venta', 'POST', '/api/ventas/4242/anticipos', {'monto': 1},
+     'FROM anticipos WHERE venta_id', ['anticipos']),
+    ('inventario no vendido', 'GET', '/api/inventario', None,
+     'FROM inventario i', ['inventario']),
+    ('inventario por estado', 'GET', '/api/inventario?estado=En Fabricacion&limit=100', None,
+     'FROM inventario i', ['inventario']),
+    ('pagina de ventas (keyset)', 'GET', '/api/ventas?limit=100&include=anticipos&cursor={cursor_ventas}',
+     None, 'FROM ventas v', ['ventas', 'inventario', 'anticipos']),
+    ('ventas de un vendedor (keyset)', 'GET', '/api/ventas?vendedor=Vendedor 3&limit=100', None,
+     'FROM ventas v', ['ventas']),
+    ('ventas por rango de fechas', 'GET', '/api/ventas?desde=2024-03-01&hasta=2024-03-31', None,
+     'FROM ventas v', ['ventas']),
+    ('pagina de cotizaciones (keyset)', 'GET', '/api/cotizaciones?limit=100', None,
+     'FROM cotizaciones c', ['cotizaciones', 'cotizacion_items']),
+    ('pagina de requisiciones (keyset)', 'GET', '/api/requisiciones?limit=100', None,
+     'FROM requisiciones r', ['requisiciones', 'proveedores']),
+    ('partidas de una cotizacion', 'GET', '/api/cotizaciones/777', None,
+     'FROM cotizacion_items ci', ['cotizacion_items']),
+    ('partidas de requisicion por proveedor', 'GET', '/api/requisiciones/321/orden-proveedor/Proveedor 323',
+     None, 'FROM requisicion_items', ['requisicion_items']),
+    ('partidas de una requisicion', 'GET', '/api/requisiciones/321', None,
+     'FROM requisicion_items', ['requisicion_items']),
+    ('envios de una requisicion', 'GET', '/api/requisiciones/321', None,
+     'FROM requisicion_envios', ['requisicion_envios']),
+    ('partes de un equipo por proveedor', 'GET', '/api/equipos/42/orden-proveedor/300', None,
+     'FROM equipo_partes', ['equipo_partes']),
+    ('proveedor por razon social', 'POST', '/api/requisiciones/321/enviar-email?proveedor=Proveedor 323',
+     None, 'FROM proveedores WHERE razon_social', ['proveedores']),
+    ('ventas cambiadas desde un token', 'GET', '/api/sync?since={token}&tablas=ventas,inventario', None,
+     'FROM ventas WHERE sync_xid', ['ventas']),
+    ('lapidas de inventario desde un token', 'GET', '/api/sync?since={token}&tablas=ventas,inventario', None,
+     'FROM inventario x', ['inventario']),
+    ('busqueda de texto completo', 'GET', '/api/search?q=cliente 4242', None,
+     'FROM ventas', ['ventas']),
+]
+
+# Sin pg_trgm la busqueda parcial es LIKE '%...%' sin indice (migrations/0008):
+# estas verificaciones solo aplican si el servidor tiene la extension
+REQUIEREN_TRGM = {'busqueda de texto completo'}
+
+# Consultas que no escribe app.py sino PostgreSQL: la revision de la llave
+# foranea al borrar un equipo necesita un indice en ventas.equipo_id
+CONSULTAS_FK = [
+    ('ventas por equipo (FK al borrar equipo)', 'DELETE /api/equipos/<eid>',
+     'SELECT 1 FROM ventas WHERE equipo_id=42 LIMIT 1', ['ventas']),
+]
+
+
+class _Captura(RealDictCursor):
+    """Cursor que guarda el SQL final (con parametros) de cada execute"""
+    sentencias = []
+
+    def execute(self, query, vars=None):
+        _Captura.sentencias.append(self.mogrify(query, vars).decode('utf-8'))
+        return super().execute(query, vars)
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get('Plans', []):
+        yield from _nodos(hijo)
+
+
+def _revisar(cur, nombre, ruta, sql, prohibidas):
+    """1 si el plan de sql tiene un Seq Scan prohibido; imprime el resultado"""
+    cur.execute('EXPLAIN (FORMAT JSON) ' + sql)
+    raw = cur.fetchone()['QUERY PLAN']
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]['Plan']
+    seq = [n['Relation Name'] for n in _nodos(plan)
+           if n['Node Type'] == 'Seq Scan' and n.get('Relation Name') in prohibidas]
+    indices = sorted({n['Index Name'] for n in _nodos(plan) if n.get('Index Name')})
+    if seq:
+        print(f"  FALLA {nombre} [{ruta}]: Seq Scan en {', '.join(seq)}")
+        return 1
+    print(f"  OK    {nombre} [{ruta}]: {', '.join(indices) or plan['Node Type']}")
+    return 0
+
+
+def verificar(url, escala=1.0):
+    volumen = {k: max(1, int(v * escala)) for k, v in VOLUMEN.items()}
+    admin = psycopg2.connect(url)
+    admin.autocommit = True
+    admin.cursor().execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}')
+    fallas = 0
+    try:
+        os.environ['DATABASE_URL'] = url
+        # Solo el esquema temporal: las migraciones crean ahi todas las tablas
+        os.environ['PGOPTIONS'] = f'-c search_path={SCHEMA}'
+        os.environ['RENDER_INLINE'] = '1'
+        os.environ['RENDER_CACHE_MAX_MB'] = '0'
+        os.environ['EMAIL_TRANSPORTE'] = 'stub'
+        os.environ['EMAIL_WORKER'] = '0'
+        # db lee DATABASE_URL al importarse y RealDictCursor al abrir cada conexion
+        import db
+        db.RealDictCursor = _Captura
+        import app as durtron
+
+        conn = psycopg2.connect(url, cursor_factory=RealDictCursor)
+        cur = conn.cursor()
+        print(f"Esquema '{SCHEMA}' con migraciones aplicadas; sembrando datos (escala {escala})...")
+        cur.execute(SEED_SQL, volumen)
+        conn.commit()
+        conn.autocommit = True
+        for t in TABLAS:
+            cur.execute(f'ANALYZE {t}')
+        cur.execute('SELECT COUNT(*) AS n FROM ventas')
+        print(f"  ventas: {cur.fetchone()['n']} | inventario: {volumen['inventario']}")
+        cur.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS ok")
+        trgm = cur.fetchone()['ok']
+        cur.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint AS token')
+        valores = {'token': cur.fetchone()['token'],
+                   'cursor_ventas': durtron.encode_cursor(['2024-06-01', 40000])}
+
+        client = durtron.app.test_client()
+        with client.session_transaction() as s:
+            s['logged_in'] = True
+            s['usuario'] = 'planes'
+        for nombre, metodo, url_ruta, cuerpo, marca, prohibidas in CONSULTAS:
+            ruta = f'{metodo} {url_ruta.split("?")[0]}'
+            if nombre in REQUIEREN_TRGM and not trgm:
+                print(f"  --    {nombre} [{ruta}]: omitida, el servidor no tiene pg_trgm")
+                continue
+            _Captura.sentencias = []
+            resp = client.open(url_ruta.format(**valores), method=metodo, json=cuerpo)
+            sql = next((s for s in _Captura.sentencias if marca in s), None)
+            if sql is None:
+                fallas += 1
+                print(f"  FALLA {nombre} [{ruta}]: la ruta ({resp.status_code}) no ejecuto '{marca}'")
+                continue
+            fallas += _revisar(cur, nombre, ruta, sql, prohibidas)
+        for nombre, ruta, sql, prohibidas in CONSULTAS_FK:
+            fallas += _revisar(cur, nombre, ruta, sql, prohibidas)
+        cur.close()
+        conn.close()
+    finally:
+        if 'db' in sys.modules:
+            sys.modules['db'].RealDictCursor = RealDictCursor
+        admin.cursor().execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        admin.close()
+    return fallas
+
+
+if __name__ == '__main__':
+    url = os.environ.get('PLANES_DATABASE_URL', '')
+    if not url:
+        print("Defina PLANES_DATABASE_URL con una base PostgreSQL local de pruebas")
+        sys.exit(2)
+    escala = 1.0
+    if '--escala' in sys.argv:
+        escala = float(sys.argv[sys.argv.index('--escala') + 1])
+    fallas = verificar(url.replace('postgres://', 'postgresql://', 1), escala)
+    if fallas:
+        print(f"{fallas} consulta(s) sin indice")
+        sys.exit(1)
+    print("Todas las consultas usan indices")